@@ -2,9 +2,14 @@ from app.comments import comment_blueprint
 from app.database import db
 from app.filters import filter_blueprint
 from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.routes import root_blueprint
 from app.summarize import summarize_blueprint
 from app.summarize.lib.diff_databases import diff_databases
+from app.summarize.lib.diff_databases.lib import (
+    migrate_schema,
+    migrate_snapshots,
+)
 from dotenv import load_dotenv
 from flask import Flask
 from flask.cli import with_appcontext
@@ -36,14 +41,20 @@ def create_app() -> Flask:
     # set up database
     db.init_app(app)
 
+    # set up tracing exporters, if any are configured
+    tracer.configure_from(app.config)
+
     # register all blueprints
     app.register_blueprint(comment_blueprint)
     app.register_blueprint(filter_blueprint)
     app.register_blueprint(root_blueprint)
     app.register_blueprint(summarize_blueprint)
 
-    # add `flask init-db` shell command
+    # add `flask init-db`, `flask migrate-schema` and
+    # `flask migrate-snapshots` shell commands
     app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_schema_command)
+    app.cli.add_command(migrate_snapshots_command)
 
     return app
 
@@ -61,11 +72,15 @@ def init_db_command():
     from app.comments.models import FieldComment, ResourceComment, Comment
     from app.filters.models import FieldFilter, MetadataFilter, ResourceFilter
     from app.summarize.models import (
+        ChangeRecord,
         CommitSnapshot,
         Field,
         Metadata,
+        RefreshCheckpoint,
         Relationship,
         Resource,
+        SnapshotCheckpoint,
+        Text,
     )
 
     # create the database instance based on the `env`
@@ -90,3 +105,26 @@ def init_db_command():
     logger.info(f"Initialized the {env} database.")
 
     diff_databases(lambda: None, True)
+
+
+@click.command("migrate-schema")
+@with_appcontext
+def migrate_schema_command():
+    """
+    Migrate an existing database to the current schema, keeping its data.
+    For use from command line via `flask migrate-schema` command, before
+    `flask migrate-snapshots`.
+    """
+
+    migrate_schema()
+
+
+@click.command("migrate-snapshots")
+@with_appcontext
+def migrate_snapshots_command():
+    """
+    Migrate existing commit snapshots to the name-keyed layout. For use from
+    command line via `flask migrate-snapshots` command.
+    """
+
+    migrate_snapshots()
@@ -1,10 +1,12 @@
 from .base_model import BaseModel, NamedBaseModel, db
+from .memoize import memoized_property
 from .types import (
     DatabaseTypes,
     DatabaseTypesSQLAlchemy,
     MongoDocumentClasses,
     MongoModelType,
 )
+from .tracing import tracer
 from .validate_request import validate_body
 
 __all__ = [
@@ -12,8 +14,10 @@ __all__ = [
     "DatabaseTypes",
     "DatabaseTypesSQLAlchemy",
     "db",
+    "memoized_property",
     "MongoDocumentClasses",
     "MongoModelType",
     "NamedBaseModel",
+    "tracer",
     "validate_body",
 ]
@@ -0,0 +1,33 @@
+from typing import Any, Callable, Optional, Type
+
+
+class memoized_property:
+    """
+    Read-only property whose getter runs at most once per instance.
+
+    Computed values are stored in a `_memo` dict on the instance rather than
+    in `__dict__`, since the extractor classes override `__dict__` with a
+    serializing property. Values are keyed by getter so that a subclass
+    overriding a memoized property never collides with its parent.
+    """
+
+    def __init__(self, getter: Callable[[Any], Any]) -> None:
+        self.__getter = getter
+        self.__doc__ = getter.__doc__
+        self.__isabstractmethod__ = getattr(
+            getter, "__isabstractmethod__", False
+        )
+
+    def __get__(self, instance: Any, owner: Optional[Type] = None) -> Any:
+        if instance is None:
+            return self
+
+        try:
+            memo = instance._memo
+        except AttributeError:
+            memo = instance._memo = {}
+
+        if self.__getter not in memo:
+            memo[self.__getter] = self.__getter(instance)
+
+        return memo[self.__getter]
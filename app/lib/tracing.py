@@ -0,0 +1,201 @@
+from app.lib.logger import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from time import perf_counter, time
+from typing import Any, Dict, List, Optional
+import json
+import threading
+
+
+# SPAN CLASSES
+
+
+class Span:
+    """
+    A timed, named section of work, with attributes (e.g. row counts) and a
+    count of database round trips made while it was open, including those
+    of nested spans.
+    """
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        attributes: Dict[str, Any],
+    ) -> None:
+        self.__tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent: Optional[Span] = None
+        self.depth = 0
+        self.round_trips = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        """Set attributes of the span."""
+
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.__tracer._open(self)
+        self.started_at = time()
+        self.__start = perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.duration = perf_counter() - self.__start
+        if exc_info[0] is not None:
+            self.attributes["error"] = exc_info[0].__name__
+
+        self.__tracer._close(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the span in `dict` format."""
+
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "depth": self.depth,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 6),
+            "round_trips": self.round_trips,
+            "attributes": self.attributes,
+        }
+
+
+class NoopSpan:
+    """Span used while tracing is disabled, which records nothing."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+# EXPORTER CLASSES
+
+
+class LogExporter:
+    """Export finished spans to the summarizer log."""
+
+    def export(self, span: Span) -> None:
+        attributes = "".join(
+            f" {key}={value}" for key, value in span.attributes.items()
+        )
+
+        logger.info(
+            f"TRACE {'  ' * span.depth}{span.name} "
+            + f"{span.duration:.3f}s round_trips={span.round_trips}"
+            + attributes
+        )
+
+
+class FileExporter:
+    """Export finished spans to a local file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+
+        with self.__lock:
+            with open(self.path, "a") as trace_file:
+                trace_file.write(line)
+
+
+# TRACER CLASS
+
+
+class Tracer:
+    """
+    Pluggable tracer for spans around refresh stages. Spans nest per thread,
+    and each finished span is passed to every exporter.
+
+    Tracing is disabled until `configure` is called with exporters. While
+    disabled, `span` returns a shared no-op span, so traced code costs one
+    attribute check per span.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.exporters: List[Any] = []
+        self.__local = threading.local()
+        self.__listening = False
+
+    def configure(self, exporters: List[Any]) -> None:
+        """Set exporters, enabling tracing if there are any."""
+
+        self.exporters = exporters
+        self.enabled = bool(exporters)
+
+        # count round trips of all engines once tracing is first enabled
+        if self.enabled and not self.__listening:
+            event.listen(Engine, "before_cursor_execute", self.__count)
+            self.__listening = True
+
+    def configure_from(self, config: Dict[str, Any]) -> None:
+        """Set exporters from app config `TRACING` and `TRACING_FILE`."""
+
+        targets = config.get("TRACING") or []
+        exporters = []
+
+        if "log" in targets:
+            exporters.append(LogExporter())
+        if "file" in targets:
+            exporters.append(FileExporter(config["TRACING_FILE"]))
+
+        self.configure(exporters)
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        """Get a span to use as a context manager around traced work."""
+
+        if not self.enabled:
+            return noop_span
+
+        return Span(self, name, attributes)
+
+    def __stack(self) -> List[Span]:
+        """Get the open spans of the current thread."""
+
+        try:
+            return self.__local.stack
+        except AttributeError:
+            self.__local.stack = []
+            return self.__local.stack
+
+    def __count(self, *args: Any) -> None:
+        """Count a database round trip against all open spans."""
+
+        for span in self.__stack():
+            span.round_trips += 1
+
+    def _open(self, span: Span) -> None:
+        stack = self.__stack()
+
+        if stack:
+            span.parent = stack[-1]
+            span.depth = len(stack)
+        stack.append(span)
+
+    def _close(self, span: Span) -> None:
+        stack = self.__stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+
+        for exporter in self.exporters:
+            exporter.export(span)
+
+
+# shared span used while tracing is disabled
+noop_span = NoopSpan()
+
+# tracer shared by the whole app, configured in `create_app`
+tracer = Tracer()
@@ -1,119 +1,539 @@
+from app.database import db
 from app.lib.logger import logger
-from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.summarize.lib.diff_databases.lib import (
     calculate_model_delta,
+    change_log,
+    extract_resources,
+    get_changed_files,
+    get_marshall_commit_id,
+    get_previous_commit_id,
+    has_commit_snapshot,
+    has_unfinished_checkpoint,
+    load_extraction_cache,
+    refresh_progress,
+    refresh_report,
+    save_extraction_cache,
+    select_affected_resources,
+    StageGraph,
+    staging_refresh,
     take_commit_snapshot,
+    take_snapshot_checkpoint,
+    text_dictionary,
     update_fields,
     update_marshall_repo,
     update_metadata,
     update_relationships,
     update_resources,
 )
-
-from app.summarize.lib.extractors import AbstractResource
+from app.summarize.lib.diff_databases.lib.helpers import chunked, names_in
+from app.summarize.lib.diff_databases.lib.summarizer_rows import (
+    get_summary_rows,
+    load_changed_rows,
+)
+from app.summarize.lib.extractors import ResourceRecord
 from app.summarize.models import Field, Metadata, Resource, Relationship
-from flask import current_app
-from typing import Callable
-from typing import Dict, List
+from flask import Flask, current_app
+from itertools import chain
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+# marshall apps to extract resources from, in extraction order
+marshall_apps = ["web", "dataparty", "mongo"]
+
 
 # HELPER FUNCTIONS
 
 
-def get_marshall_resources() -> List[AbstractResource]:
-    """Get all resources from marshall app code."""
+def iter_marshall_resources() -> Iterator[ResourceRecord]:
+    """
+    Lazily extract records of all resources from marshall app code. Each
+    resource's extractor is released as soon as its record is produced.
+    """
 
     from app.summarize.lib import MarshallModels
 
-    models = MarshallModels()
+    with tracer.span("marshall_models"):
+        models = MarshallModels()
 
-    return (
-        models.get_models("web")
-        + models.get_models("dataparty")
-        + models.get_models("mongo")
-    )
+    for app in marshall_apps:
+        with tracer.span("extract_app", app=app) as span:
+            resources = models.get_models(app)
+            span.set(rows=len(resources))
+        resources.reverse()
 
+        while resources:
+            yield ResourceRecord.from_extractor(resources.pop())
 
-def get_summarizer_data() -> Dict:
+
+def get_marshall_resources(
+    workers: int = 1, shard_by_module: bool = False
+) -> List[ResourceRecord]:
     """
-    Get resource, field, relationship, and metadata data from summarizer
-    database.
+    Get records of all resources from marshall app code. If `workers` is
+    greater than 1, extract resources in a process pool.
     """
 
-    return {
-        "resources": Resource.query.all(),
-        "fields": Field.query.all(),
-        "metadata": Metadata.query.all(),
-        "relationships": Relationship.query.all(),
-    }
+    if workers > 1:
+        with tracer.span("extract_resources", workers=workers) as span:
+            resources = extract_resources(
+                marshall_apps, workers, shard_by_module
+            )
+            span.set(rows=len(resources))
 
+        return resources
 
-# MAIN FUNCTION
+    return list(iter_marshall_resources())
 
 
-def diff_databases(on_complete: Callable, force: bool = False) -> None:
+def get_changed_marshall_resources(
+    changed_files: Set[str],
+) -> Tuple[List[ResourceRecord], Set[str]]:
     """
-    Compare current marshall repo models to summarizer database data
-    and update database to reflect marshall models.
+    Get records of marshall resources affected by changes to `changed_files`,
+    along with names of unaffected resources to carry over untouched.
     """
 
-    from app import create_app
+    from app.summarize.lib import MarshallModels
 
-    app = None
+    with tracer.span("marshall_models"):
+        models = MarshallModels()
 
-    # check if there is already an app context to use
-    if current_app:
-        app = current_app
-    # if not, create app context to access database
-    else:
-        app = create_app()
-        app.app_context().push()
+    all_resources = []
+    for app in marshall_apps:
+        with tracer.span("extract_app", app=app) as span:
+            app_resources = models.get_models(app)
+            span.set(rows=len(app_resources))
+        all_resources.extend(app_resources)
 
-    # fetch latest changes to marshall
-    was_updated = update_marshall_repo()
+    resources, carried_over = select_affected_resources(
+        all_resources, changed_files
+    )
 
-    # do not sync data if marshall was not updated, unless `force === True`
-    if not was_updated and not force:
-        logger.info("REFRESH COMPLETE")
+    logger.info(
+        f"Extracting {len(resources)} marshall resources affected by "
+        + f"{len(changed_files)} changed files..."
+    )
 
-        on_complete()
-        return
+    return [ResourceRecord.from_extractor(r) for r in resources], carried_over
 
-    # take snapshot delta of commits from current version which will now
-    # be archived
-    take_commit_snapshot()
 
-    # extract data from marshall and from summarizer DB
-    marshall_resources = get_marshall_resources()
-    summarizer_data = get_summarizer_data()
+def get_summarizer_resources(
+    included: Optional[Collection[str]] = None,
+    excluded: Collection[str] = (),
+) -> Iterator:
+    """
+    Stream summary rows of resources from summarizer database, sorted by
+    name. Resources can be limited to `included` ones, and `excluded`
+    resources are left out.
+    """
 
-    # update marshall resource data in summarizer
-    resource_delta = calculate_model_delta(
-        summarizer_data["resources"], marshall_resources
-    )
+    criteria = [Resource.name.notin_(list(excluded))]
 
-    marshall_fields, marshall_relationships = update_resources(resource_delta)
+    if included is not None:
+        criteria.append(names_in(Resource.name, included))
+
+    return get_summary_rows(Resource, *criteria)
 
-    # update marshall field data in summarizer
-    field_delta = calculate_model_delta(
-        summarizer_data["fields"], marshall_fields
-    )
 
-    marshall_metadata = update_fields(field_delta)
+def sorted_by_name(records: Iterable) -> List:
+    """Sort records by name, to merge-join them against summary rows."""
 
-    # update marshall metadata in summarizer
-    metadata_delta = calculate_model_delta(
-        summarizer_data["metadata"], marshall_metadata, False
+    return sorted(records, key=lambda record: record.name)
+
+
+def get_changed_names(delta: Dict, unchanged: Set[str]) -> List[str]:
+    """
+    Get names of previously stored models whose children may have changed:
+    restored, removed, and persisted models not skipped as unchanged.
+    """
+
+    return [
+        model.name
+        for model in chain(
+            delta["restored"], delta["removed"], delta["persisted"]
+        )
+        if model.name not in unchanged
+    ]
+
+
+def refresh_resources(
+    marshall_resources: List[ResourceRecord],
+    included: Optional[Collection[str]] = None,
+    excluded: Collection[str] = (),
+    chunk: int = 0,
+) -> None:
+    """
+    Update summarizer data to reflect marshall resources, stage by stage, as
+    chunk `chunk` of the refresh. Summarizer resources can be limited to
+    `included` ones, and `excluded` resources are left out.
+
+    Each stage merge-joins name-sorted summary rows (name, archive flag and
+    content hash) streamed from the summarizer database against marshall
+    records. Full rows are fetched only for persisted models whose content
+    hashes differ, and only the children of resources and fields that were
+    not skipped as unchanged are read at all.
+
+    Stages run in a `StageGraph` ordered by foreign keys (resources, then
+    fields, then metadata; resources, then relationships), so with
+    `REFRESH_STAGE_WORKERS` above 1 the metadata and relationship stages
+    run concurrently on separate connections.
+
+    Each finished stage and the finished chunk are recorded in the refresh
+    checkpoint through `refresh_progress`.
+    """
+
+    workers = current_app.config.get("REFRESH_STAGE_WORKERS", 1)
+    skip_unchanged = refresh_progress.can_skip_unchanged(chunk)
+
+    def refresh_resource_stage(results: Dict) -> Dict:
+        """Update resources and collect children of changed resources."""
+
+        with refresh_report.timed("resources"):
+            resource_delta = calculate_model_delta(
+                get_summarizer_resources(included, excluded),
+                sorted_by_name(marshall_resources),
+                True,
+                True,
+            )
+            load_changed_rows(Resource, resource_delta)
+
+            with tracer.span("update_resources") as span:
+                (
+                    marshall_fields,
+                    marshall_relationships,
+                    unchanged_resources,
+                ) = update_resources(resource_delta, skip_unchanged)
+                span.set(rows=len(marshall_resources))
+
+            # concurrent stages must not insert texts, so store them first
+            if workers > 1:
+                text_dictionary.preload(
+                    chain(
+                        marshall_fields,
+                        (
+                            m
+                            for field in marshall_fields
+                            for m in field.metadata
+                        ),
+                        marshall_relationships,
+                    )
+                )
+
+        refresh_progress.finish_stage("resources")
+
+        # children of resources with unchanged content hashes were skipped,
+        # so leave them out of the summarizer side too
+        return {
+            "changed": get_changed_names(resource_delta, unchanged_resources),
+            "fields": marshall_fields,
+            "relationships": marshall_relationships,
+        }
+
+    def refresh_field_stage(results: Dict) -> Dict:
+        """Update fields of changed resources."""
+
+        marshall_fields = results["resources"]["fields"]
+
+        with refresh_report.timed("fields"):
+            field_delta = calculate_model_delta(
+                get_summary_rows(
+                    Field,
+                    names_in(
+                        Field.resource_name, results["resources"]["changed"]
+                    ),
+                ),
+                sorted_by_name(marshall_fields),
+                True,
+                True,
+            )
+            load_changed_rows(Field, field_delta)
+
+            with tracer.span("update_fields", rows=len(marshall_fields)):
+                marshall_metadata, unchanged_fields = update_fields(
+                    field_delta, skip_unchanged
+                )
+
+        refresh_progress.finish_stage("fields")
+
+        # likewise leave out metadata of skipped fields
+        return {
+            "changed": get_changed_names(field_delta, unchanged_fields),
+            "metadata": marshall_metadata,
+        }
+
+    def refresh_metadata_stage(results: Dict) -> None:
+        """Update metadata of changed fields."""
+
+        marshall_metadata = results["fields"]["metadata"]
+
+        with refresh_report.timed("metadata"):
+            metadata_delta = calculate_model_delta(
+                get_summary_rows(
+                    Metadata,
+                    names_in(
+                        Metadata.field_name, results["fields"]["changed"]
+                    ),
+                ),
+                sorted_by_name(marshall_metadata),
+                False,
+                True,
+            )
+            load_changed_rows(Metadata, metadata_delta)
+
+            with tracer.span("update_metadata", rows=len(marshall_metadata)):
+                update_metadata(metadata_delta)
+
+        refresh_progress.finish_stage("metadata")
+
+    def refresh_relationship_stage(results: Dict) -> None:
+        """Update relationships of changed resources."""
+
+        marshall_relationships = results["resources"]["relationships"]
+
+        with refresh_report.timed("relationships"):
+            relationship_delta = calculate_model_delta(
+                get_summary_rows(
+                    Relationship,
+                    names_in(
+                        Relationship.resource_name,
+                        results["resources"]["changed"],
+                    ),
+                ),
+                sorted_by_name(marshall_relationships),
+                False,
+                True,
+            )
+            load_changed_rows(Relationship, relationship_delta)
+
+            with tracer.span(
+                "update_relationships", rows=len(marshall_relationships)
+            ):
+                update_relationships(relationship_delta)
+
+        refresh_progress.finish_stage("relationships")
+
+    stages = StageGraph()
+    stages.add("resources", refresh_resource_stage)
+    stages.add("fields", refresh_field_stage, after=["resources"])
+    stages.add("metadata", refresh_metadata_stage, after=["fields"])
+    stages.add(
+        "relationships", refresh_relationship_stage, after=["resources"]
     )
+    stages.run(workers)
+
+    refresh_progress.finish_chunk(chunk)
 
-    update_metadata(metadata_delta)
 
-    # update marshall relationships in summarizer
-    relationship_delta = calculate_model_delta(
-        summarizer_data["relationships"], marshall_relationships, False
+def stream_refresh(
+    marshall_resources: Iterable[ResourceRecord],
+    chunk_size: int,
+    carried_over: Collection[str] = (),
+) -> None:
+    """
+    Update summarizer data to reflect marshall resources in chunks of
+    `chunk_size` resources, loading only the summarizer data belonging to
+    each chunk. Summarizer resources never seen in a chunk are archived in a
+    final pass, along with their children.
+    """
+
+    seen = set(carried_over)
+    index = -1
+
+    for index, chunk in enumerate(chunked(marshall_resources, chunk_size)):
+        names = [resource.name for resource in chunk]
+        seen.update(names)
+
+        if refresh_progress.is_chunk_finished(index):
+            logger.info(f"Skipping chunk {index + 1}, refreshed already")
+            continue
+
+        logger.info(f"Refreshing chunk {index + 1} ({len(chunk)} resources)")
+
+        refresh_resources(chunk, included=names, chunk=index)
+
+    if not refresh_progress.is_chunk_finished(index + 1):
+        logger.info("Refreshing resources removed from marshall")
+
+        refresh_resources([], excluded=seen, chunk=index + 1)
+
+
+def refresh(app: Flask, force: bool, dry_run: bool) -> None:
+    """
+    Refresh summarizer data from the current marshall commit, unless it
+    is summarized already. See `diff_databases`.
+    """
+
+    refresh_report.start(dry_run)
+    change_log.start(None)
+
+    # fetch latest changes to marshall
+    with tracer.span("update_marshall_repo") as span:
+        was_updated = update_marshall_repo()
+        span.set(was_updated=was_updated)
+    current_commit_id = get_marshall_commit_id()
+
+    # do not sync data if marshall was not updated, unless `force === True`.
+    # A commit fetched without being summarized, e.g. by a dry run, or whose
+    # refresh was interrupted, is still synced
+    if (
+        not was_updated
+        and not force
+        and has_commit_snapshot(current_commit_id)
+        and not has_unfinished_checkpoint(current_commit_id)
+    ):
+        logger.info("REFRESH COMPLETE")
+        return
+
+    cache_dir = app.config.get("EXTRACTION_CACHE_DIR")
+    chunk_size = app.config.get("REFRESH_CHUNK_SIZE", 0)
+
+    # staging refreshes merge the complete extracted state at once, so are
+    # neither incremental nor streamed. Dry runs always plan through the
+    # update stages
+    staging = app.config.get("REFRESH_STAGING", False) and not dry_run
+    if staging:
+        chunk_size = 0
+
+    # record progress in a checkpoint of the current commit, resuming an
+    # interrupted refresh of the commit from its last finished chunk
+    refresh_progress.start(None if dry_run else current_commit_id, chunk_size)
+
+    # in incremental mode, find marshall files changed since the last
+    # summarized commit. Forced refreshes, and refreshes repairing an
+    # interrupted refresh of another commit, always re-extract everything
+    changed_files = None
+    incremental = app.config.get("REFRESH_INCREMENTAL", False)
+    if (
+        incremental
+        and not force
+        and not staging
+        and not refresh_progress.is_repairing
+    ):
+        previous_commit_id = get_previous_commit_id(current_commit_id)
+
+        if previous_commit_id:
+            changed_files = get_changed_files(
+                previous_commit_id, current_commit_id
+            )
+
+    # create the snapshot of the current commit, and log all changes of the
+    # refresh to it as they are written
+    if not dry_run:
+        with refresh_report.timed("snapshot"), tracer.span(
+            "take_commit_snapshot"
+        ):
+            if take_commit_snapshot():
+                change_log.start(current_commit_id)
+
+    # extract data from marshall, preferring a cached extraction of the
+    # current commit over importing marshall
+    marshall_resources = (
+        load_extraction_cache(cache_dir, current_commit_id)
+        if cache_dir
+        else None
     )
+    carried_over = set()
+
+    if marshall_resources is None and changed_files is not None:
+        with refresh_report.timed("extraction"):
+            marshall_resources, carried_over = get_changed_marshall_resources(
+                changed_files
+            )
+    elif marshall_resources is None and chunk_size:
+        # streamed extractions are never held in full, so are not cached.
+        # Their extraction time is part of each stage's time
+        marshall_resources = iter_marshall_resources()
+    elif marshall_resources is None:
+        with refresh_report.timed("extraction"):
+            marshall_resources = get_marshall_resources(
+                app.config.get("EXTRACTION_WORKERS", 1),
+                app.config.get("EXTRACTION_SHARD_BY_MODULE", False),
+            )
+
+        if cache_dir:
+            save_extraction_cache(
+                cache_dir, current_commit_id, marshall_resources
+            )
+
+    # load hashes of stored descriptions and metadata values, so only new
+    # texts are written
+    text_dictionary.load()
+
+    # update summarizer data, through staging tables or in bounded chunks if
+    # configured
+    if staging:
+        with refresh_report.timed("staging"), tracer.span(
+            "staging_refresh", rows=len(marshall_resources)
+        ):
+            staging_refresh(marshall_resources)
+    elif chunk_size:
+        stream_refresh(marshall_resources, chunk_size, carried_over)
+    elif not refresh_progress.is_chunk_finished(0):
+        refresh_resources(marshall_resources, excluded=carried_over)
+
+    if dry_run:
+        logger.info(f"DRY RUN COMPLETE: {refresh_report.to_dict()}")
+        return
+
+    # remove texts no longer referenced after the refresh
+    pruned = text_dictionary.prune()
+    logger.info(f"Pruned {pruned} unreferenced texts")
+
+    # materialize the state as of this commit, if enough history has
+    # accumulated since the last checkpoint
+    take_snapshot_checkpoint()
 
-    update_relationships(relationship_delta)
+    refresh_progress.complete()
 
     logger.info("REFRESH COMPLETE")
 
-    on_complete()
+
+# MAIN FUNCTION
+
+
+def diff_databases(
+    on_complete: Callable, force: bool = False, dry_run: bool = False
+) -> None:
+    """
+    Compare current marshall repo models to summarizer database data
+    and update database to reflect marshall models.
+
+    If `dry_run` is set, plan all changes without writing anything to the
+    database (including a commit snapshot) and report the planned changes
+    and timings through `refresh_report` instead.
+
+    Progress is checkpointed per chunk, so if a refresh fails or the
+    process dies, the next refresh resumes where it stopped. `on_complete`
+    is called however the refresh ends.
+    """
+
+    from app import create_app
+
+    app = None
+
+    # check if there is already an app context to use
+    if current_app:
+        app = current_app
+    # if not, create app context to access database
+    else:
+        app = create_app()
+        app.app_context().push()
+
+    try:
+        refresh(app, force, dry_run)
+    except Exception:
+        logger.exception("REFRESH FAILED")
+        db.session.rollback()
+        raise
+    finally:
+        on_complete()
@@ -1,5 +1,33 @@
 from .calculate_model_delta import calculate_model_delta
-from .take_commit_snapshot import take_commit_snapshot
+from .change_log import apply_changes, change_log
+from .extract_resources import extract_resources
+from .extraction_cache import load_extraction_cache, save_extraction_cache
+from .incremental import (
+    get_changed_files,
+    get_previous_commit_id,
+    select_affected_resources,
+)
+from .migrate_schema import migrate_schema
+from .migrate_snapshots import migrate_snapshots
+from .refresh_progress import has_unfinished_checkpoint, refresh_progress
+from .refresh_report import refresh_report
+from .snapshot_diff import get_commit_diff
+from .snapshot_history import (
+    get_commit_state,
+    get_snapshot_state,
+    replay_snapshots,
+    take_snapshot_checkpoint,
+)
+from .snapshot_layout import to_keyed, to_list
+from .stage_graph import StageGraph
+from .staging_refresh import staging_refresh
+from .state_cache import get_cached_commit_state, state_cache
+from .take_commit_snapshot import (
+    get_marshall_commit_id,
+    has_commit_snapshot,
+    take_commit_snapshot,
+)
+from .text_dictionary import text_dictionary
 from .update_fields import update_fields
 from .update_marshall_repo import update_marshall_repo
 from .update_metadata import update_metadata
@@ -7,8 +35,35 @@ from .update_relationships import update_relationships
 from .update_resources import update_resources
 
 __all__ = [
+    "apply_changes",
     "calculate_model_delta",
+    "change_log",
+    "extract_resources",
+    "get_cached_commit_state",
+    "get_changed_files",
+    "get_commit_diff",
+    "get_commit_state",
+    "get_marshall_commit_id",
+    "get_previous_commit_id",
+    "get_snapshot_state",
+    "has_commit_snapshot",
+    "has_unfinished_checkpoint",
+    "load_extraction_cache",
+    "migrate_schema",
+    "migrate_snapshots",
+    "refresh_progress",
+    "refresh_report",
+    "replay_snapshots",
+    "save_extraction_cache",
+    "select_affected_resources",
+    "StageGraph",
+    "staging_refresh",
+    "state_cache",
     "take_commit_snapshot",
+    "take_snapshot_checkpoint",
+    "text_dictionary",
+    "to_keyed",
+    "to_list",
     "update_fields",
     "update_marshall_repo",
     "update_metadata",
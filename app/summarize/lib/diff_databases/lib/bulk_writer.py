@@ -0,0 +1,210 @@
+from app.database import db
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.helpers import chunked
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
+)
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    text_dictionary,
+)
+from flask import current_app
+from sqlalchemy import any_, bindparam, delete, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from typing import Any, Dict, Iterator, List, Optional
+
+# default number of rows written per statement
+default_batch_size = 1000
+
+
+class BulkWriter:
+    """
+    Plan and apply the writes of an update stage to a named model as
+    set-based statements, instead of one statement per row.
+
+    Stages plan writes row by row with `upsert`, `archive`, `unarchive` and
+    `delete`, then call `apply` once. Planned rows are written in batches of
+    `batch_size` (the `WRITE_BATCH_SIZE` setting by default):
+
+    - created and updated rows with `INSERT ... ON CONFLICT DO UPDATE`
+    - archived and unarchived rows with `UPDATE ... WHERE name = ANY(...)`
+    - deleted rows with `DELETE ... WHERE name = ANY(...)`
+
+    If `commit_size` (the `COMMIT_CHUNK_SIZE` setting by default) is set,
+    the transaction is committed whenever at least that many rows were
+    written since the last commit, so locks are held briefly and an
+    interrupted stage keeps the rows it wrote. Otherwise the stage commits
+    all its writes at once.
+
+    New texts referenced by planned rows are stored in batches before the
+    rows (see `TextDictionary`). Change records the stage logged while
+    planning are appended to the commit snapshot in the transaction writing
+    their rows (see `ChangeLog`), so an interrupted stage never logs rows
+    it did not write. In a dry run, planned writes are discarded instead of
+    applied.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        batch_size: Optional[int] = None,
+        commit_size: Optional[int] = None,
+    ) -> None:
+        self.__model = model
+        self.__batch_size = batch_size or current_app.config.get(
+            "WRITE_BATCH_SIZE", default_batch_size
+        )
+        self.__commit_size = commit_size or current_app.config.get(
+            "COMMIT_CHUNK_SIZE", 0
+        )
+        self.__uncommitted: List[str] = []
+        self.__records: Dict[str, List[Dict[str, Any]]] = {}
+        self.__upserted: List[Dict[str, Any]] = []
+        self.__archived: List[str] = []
+        self.__unarchived: List[str] = []
+        self.__deleted: List[str] = []
+
+    # PLANNING METHODS
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Plan a row to be created, or updated if it exists."""
+
+        self.__upserted.append(row)
+
+    def archive(self, name: str) -> None:
+        """Plan a row to be archived."""
+
+        self.__archived.append(name)
+
+    def unarchive(self, name: str) -> None:
+        """Plan a row to be unarchived."""
+
+        self.__unarchived.append(name)
+
+    def delete(self, name: str) -> None:
+        """Plan a row to be deleted."""
+
+        self.__deleted.append(name)
+
+    # WRITE METHODS
+
+    def __batches(self, items: List) -> Iterator[List]:
+        """Split planned items into batches."""
+
+        return chunked(items, self.__batch_size)
+
+    def __log_uncommitted(self) -> None:
+        """Log the change records of rows written since the last commit."""
+
+        change_log.write(
+            [
+                record
+                for name in self.__uncommitted
+                for record in self.__records.pop(name, [])
+            ]
+        )
+
+    def __execute(self, statement: Any, params: Any, names: List) -> None:
+        """Execute a batch, committing once a chunk of rows was written."""
+
+        db.session.execute(statement, params)
+        self.__uncommitted.extend(names)
+
+        if (
+            self.__commit_size
+            and len(self.__uncommitted) >= self.__commit_size
+        ):
+            self.__log_uncommitted()
+            with tracer.span(
+                "commit",
+                model=self.__model.__name__,
+                rows=len(self.__uncommitted),
+            ):
+                db.session.commit()
+            self.__uncommitted = []
+
+    def __upsert_rows(self) -> None:
+        """Create or update all planned rows."""
+
+        for rows in self.__batches(self.__upserted):
+            statement = insert(self.__model)
+            statement = statement.on_conflict_do_update(
+                index_elements=["name"],
+                set_={
+                    **{
+                        column: statement.excluded[column]
+                        for column in rows[0]
+                        if column != "name"
+                    },
+                    "date_modified": db.func.current_timestamp(),
+                },
+            )
+
+            self.__execute(statement, rows, [row["name"] for row in rows])
+
+    def __set_archived(self, names: List[str], is_archived: bool) -> None:
+        """Set archived state of all named rows."""
+
+        statement = (
+            update(self.__model)
+            .where(self.__model.name == any_(self.__names_param()))
+            .values(is_archived=is_archived)
+        )
+
+        for batch in self.__batches(names):
+            self.__execute(statement, {"names": batch}, batch)
+
+    def __delete_rows(self) -> None:
+        """Delete all planned rows."""
+
+        statement = delete(self.__model).where(
+            self.__model.name == any_(self.__names_param())
+        )
+
+        for batch in self.__batches(self.__deleted):
+            self.__execute(statement, {"names": batch}, batch)
+
+    def __names_param(self) -> Any:
+        """Get a bound array parameter of row names."""
+
+        return bindparam("names", type_=ARRAY(self.__model.name.type))
+
+    def apply(self) -> None:
+        """Write all planned changes to the session's transaction."""
+
+        if not refresh_report.dry_run:
+            # log planned changes in the transactions writing their rows
+            for record in change_log.take():
+                self.__records.setdefault(record["name"], []).append(record)
+
+            # store new texts before the rows referencing them
+            text_dictionary.flush()
+
+            with tracer.span(
+                "bulk_write",
+                model=self.__model.__name__,
+                upserted=len(self.__upserted),
+                archived=len(self.__archived),
+                unarchived=len(self.__unarchived),
+                deleted=len(self.__deleted),
+            ):
+                self.__upsert_rows()
+                self.__set_archived(self.__unarchived, False)
+                self.__set_archived(self.__archived, True)
+                self.__delete_rows()
+
+            # the stage commits the remaining writes along with their records
+            change_log.write(
+                [
+                    record
+                    for records in self.__records.values()
+                    for record in records
+                ]
+            )
+            self.__records = {}
+            self.__uncommitted = []
+
+        self.__upserted = []
+        self.__archived = []
+        self.__unarchived = []
+        self.__deleted = []
@@ -1,43 +1,95 @@
-from typing import Dict, List
+from app.lib.tracing import tracer
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+
+# HELPER FUNCTIONS
+
+
+def merge_by_name(
+    prev_models: Iterable, next_models: Iterable
+) -> Iterator[Tuple[Optional[Any], Optional[Any]]]:
+    """
+    Merge-join previous and next models, both sorted by name, yielding pairs
+    of models with the same name. Either side of a pair is `None` if there
+    is no model with that name on that side. Neither side is read ahead or
+    buffered, so either side can be streamed.
+    """
+
+    prev_iter, next_iter = iter(prev_models), iter(next_models)
+    prev_model, next_model = next(prev_iter, None), next(next_iter, None)
+
+    while prev_model is not None or next_model is not None:
+        if next_model is None or (
+            prev_model is not None and prev_model.name < next_model.name
+        ):
+            yield prev_model, None
+            prev_model = next(prev_iter, None)
+        elif prev_model is None or next_model.name < prev_model.name:
+            yield None, next_model
+            next_model = next(next_iter, None)
+        else:
+            yield prev_model, next_model
+            prev_model = next(prev_iter, None)
+            next_model = next(next_iter, None)
+
+
+# MAIN FUNCTION
 
 
 def calculate_model_delta(
-    prev_models: List, next_models: List, archivable: bool = True
+    prev_models: Iterable,
+    next_models: Iterable,
+    archivable: bool = True,
+    presorted: bool = False,
 ) -> Dict:
     """
     Compare previous models to next models to determine which models are new,
     restored, removed, or persisted and return names of models in each
     category. Return arrays of next models in each category except the
-    "removed" category for which previous models will be returned.
+    "removed" category for which previous models will be returned. Previous
+    models of persisted models whose content hashes differ are also
+    returned indexed by name under "previous", so changed models can be
+    compared without querying for them again, while unchanged ones are
+    dropped as soon as they are matched.
+
+    Models are matched in a single merge-join pass over both sides sorted by
+    name. If `presorted` is set, both sides must already be sorted by name
+    and are consumed as streams, so e.g. previous models can be read from a
+    server-side cursor holding only the previous models of removed and
+    changed models in memory. Next models are returned in their categories,
+    so are held in full either way.
     """
 
-    if archivable:
-
-        prev_archived_names = {m.name for m in prev_models if m.is_archived}
-        prev_names = {m.name for m in prev_models if not m.is_archived}
-        next_names = {m.name for m in next_models}
-
-        new = list(next_names.difference(prev_names, prev_archived_names))
-        restored = list(prev_archived_names.intersection(next_names))
-        removed = list(prev_names.difference(next_names))
-        persisted = list(prev_names.intersection(next_names))
-
-        return {
-            "new": [m for m in next_models if m.name in new],
-            "restored": [m for m in next_models if m.name in restored],
-            "removed": [m for m in prev_models if m.name in removed],
-            "persisted": [m for m in next_models if m.name in persisted],
-        }
-    else:
-        prev_names = {m.name for m in prev_models}
-        next_names = {m.name for m in next_models}
-
-        new = list(next_names.difference(prev_names))
-        removed = list(prev_names.difference(next_names))
-        persisted = list(prev_names.intersection(next_names))
-
-        return {
-            "new": [m for m in next_models if m.name in new],
-            "removed": [m for m in prev_models if m.name in removed],
-            "persisted": [m for m in next_models if m.name in persisted],
-        }
+    with tracer.span("calculate_model_delta", archivable=archivable) as span:
+        if not presorted:
+            prev_models = sorted(prev_models, key=lambda m: m.name)
+            next_models = sorted(next_models, key=lambda m: m.name)
+
+        delta = {"new": [], "removed": [], "persisted": [], "previous": {}}
+        if archivable:
+            delta["restored"] = []
+
+        for prev_model, next_model in merge_by_name(prev_models, next_models):
+            if prev_model is None:
+                delta["new"].append(next_model)
+            elif archivable and prev_model.is_archived:
+                if next_model is not None:
+                    delta["restored"].append(next_model)
+            elif next_model is None:
+                delta["removed"].append(prev_model)
+            else:
+                delta["persisted"].append(next_model)
+
+                if prev_model.content_hash != next_model.content_hash:
+                    delta["previous"][prev_model.name] = prev_model
+
+        span.set(
+            previous=len(delta["previous"]),
+            **{
+                key: len(models)
+                for key, models in delta.items()
+                if key != "previous"
+            },
+        )
+
+    return delta
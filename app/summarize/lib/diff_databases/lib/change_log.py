@@ -0,0 +1,243 @@
+from app.database import db
+from app.summarize.lib.extractors.records import Record
+from app.summarize.models import ChangeRecord, CommitSnapshot
+from sqlalchemy import insert, select
+from typing import Any, Dict, List, Optional
+import threading
+
+# keys of each entity's entries in snapshot documents, in document order,
+# excluding child lists
+document_keys = {
+    "resource": (
+        "type",
+        "name",
+        "app",
+        "database_type",
+        "source_link",
+        "description",
+    ),
+    "field": (
+        "name",
+        "type",
+        "resource_name",
+        "is_primary_key",
+        "is_virtual",
+        "description",
+    ),
+    "metadata": ("name", "field_name", "value", "description"),
+    "relationship": (
+        "name",
+        "type",
+        "field_name",
+        "related_field_name",
+        "resource_name",
+        "related_resource_name",
+        "description",
+    ),
+}
+
+# child lists of each entity's entries, with the entity of their children
+document_children = {
+    "resource": {"fields": "field", "relationships": "relationship"},
+    "field": {"metadata": "metadata"},
+    "metadata": {},
+    "relationship": {},
+}
+
+# parent entity of each child entity, with the key naming the parent and
+# the parent's child list holding the child
+document_parents = {
+    "field": ("resource", "resource_name", "fields"),
+    "metadata": ("field", "field_name", "metadata"),
+    "relationship": ("resource", "resource_name", "relationships"),
+}
+
+
+# HELPER FUNCTIONS
+
+
+def document_entry(entity: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a snapshot document entry from the data of a change record, as
+    `SummarizerResource` and friends would serialize the stored row.
+    """
+
+    entry = {key: data.get(key) for key in document_keys[entity]}
+
+    # stored resources are always serialized as summarizer resources
+    if entity == "resource":
+        entry["database_type"] = "summarizer"
+
+    return entry
+
+
+def apply_changes(document: Dict[str, Dict], changes: List[Dict]) -> Dict:
+    """
+    Apply change records to a name-keyed snapshot document (resources keyed
+    by name, each holding its fields and relationships keyed by name) in
+    place, and get the document.
+
+    Archived rows stay in snapshot documents, so archive and unarchive
+    records only change an entry's data. Applying a record is idempotent,
+    so records repeated by a resumed refresh do no harm.
+    """
+
+    # index entries of every entity by name, along with the dict holding them
+    index = {entity: {} for entity in document_keys}
+
+    def index_entry(entity: str, entry: Dict, holder: Dict) -> None:
+        index[entity][entry["name"]] = (entry, holder)
+
+        for key, child_entity in document_children[entity].items():
+            for child in entry.get(key, {}).values():
+                index_entry(child_entity, child, entry[key])
+
+    for resource in document.values():
+        index_entry("resource", resource, document)
+
+    for change in changes:
+        entity, name = change["entity"], change["name"]
+        existing = index[entity].get(name)
+
+        if change["op"] == "delete":
+            if existing is not None:
+                entry, holder = existing
+                del holder[name]
+                del index[entity][name]
+            continue
+
+        if change.get("data") is None:
+            continue
+
+        if existing is not None:
+            existing[0].update(document_entry(entity, change["data"]))
+            continue
+
+        # created (or previously unlogged) entries are added to their
+        # parent, which earlier stages always store first
+        entry = document_entry(entity, change["data"])
+        for key in document_children[entity]:
+            entry[key] = {}
+
+        if entity in document_parents:
+            parent_entity, parent_key, holder_key = document_parents[entity]
+            parent = index[parent_entity].get(entry[parent_key])
+            if parent is None:
+                continue
+            holder = parent[0][holder_key]
+        else:
+            holder = document
+
+        holder[name] = entry
+        index_entry(entity, entry, holder)
+
+    return document
+
+
+# CHANGE LOG CLASS
+
+
+class ChangeLog:
+    """
+    Structured change records emitted by the update stages as they write,
+    persisted as the current commit's snapshot.
+
+    Each record holds the operation (`create`, `update`, `archive`,
+    `unarchive` or `delete`), entity type, row name and, unless the row was
+    archived or deleted, the row's data. Stages add records while planning
+    writes, and `flush` inserts them as a `ChangeRecord` row of the
+    snapshot in the same transaction as the writes, so snapshot cost is
+    proportional to the size of the change rather than the catalog. Stages
+    committing in chunks `take` their records instead, and `write` those
+    of the rows each chunk wrote before committing it.
+
+    Records are appended as new rows rather than to the snapshot row, so
+    stages running concurrently never wait on each other's flushes, and
+    each flush only writes its own records. Records are buffered per
+    thread, so concurrent stages each flush their own records. Call `start`
+    at the start of a refresh.
+    """
+
+    def __init__(self) -> None:
+        self.start(None)
+
+    def start(self, commit_id: Optional[str]) -> None:
+        """
+        Log changes to the snapshot of a commit. A refresh without commit
+        id, such as a dry run, logs nothing.
+        """
+
+        self.commit_id = commit_id
+        self.__local = threading.local()
+
+    def __records(self) -> List[Dict[str, Any]]:
+        """Get the records of the current thread not yet flushed."""
+
+        try:
+            return self.__local.records
+        except AttributeError:
+            self.__local.records = []
+            return self.__local.records
+
+    def add(
+        self,
+        op: str,
+        entity: str,
+        name: str,
+        record: Optional[Record] = None,
+    ) -> None:
+        """Log a change to a row, with the row's data if it has a record."""
+
+        if self.commit_id is None:
+            return
+
+        data = None
+        if record is not None:
+            data = {
+                column: getattr(record, column) for column in record.columns
+            }
+
+        self.__records().append(
+            {"op": op, "entity": entity, "name": name, "data": data}
+        )
+
+    def take(self) -> List[Dict[str, Any]]:
+        """Get the records of the current thread, removing them from it."""
+
+        records = self.__records()
+        self.__local.records = []
+
+        return records
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append records to the snapshot as a change record row, in the
+        session's transaction.
+        """
+
+        if self.commit_id is None or not records:
+            return
+
+        snapshot_id = (
+            select(CommitSnapshot.id)
+            .where(CommitSnapshot.commit_id == self.commit_id)
+            .scalar_subquery()
+        )
+
+        db.session.execute(
+            insert(ChangeRecord).values(
+                snapshot_id=snapshot_id, records=records, count=len(records)
+            )
+        )
+
+    def flush(self) -> None:
+        """
+        Append the current thread's records to the snapshot as a change
+        record row, in the session's transaction.
+        """
+
+        self.write(self.take())
+
+
+# change log shared by all update stages, restarted once per refresh
+change_log = ChangeLog()
@@ -0,0 +1,98 @@
+from app.lib.logger import logger
+from app.summarize.lib.extractors import ResourceRecord
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional, Tuple
+
+# `MarshallModels` instance of the current worker process, set up once per
+# worker by `init_worker`
+worker_models = None
+
+
+# WORKER FUNCTIONS
+
+
+def init_worker() -> None:
+    """Set up `django` for marshall once per worker process."""
+
+    global worker_models
+
+    from app.summarize.lib import MarshallModels
+
+    worker_models = MarshallModels()
+
+
+def get_model_modules(app: str) -> List[str]:
+    """Get names of all modules defining models in a marshall app."""
+
+    modules = []
+
+    for resource in worker_models.get_models(app):
+        module = resource.name.rsplit(".", 1)[0]
+        if module not in modules:
+            modules.append(module)
+
+    return modules
+
+
+def extract_shard(
+    app: str, module: Optional[str] = None
+) -> List[Tuple[int, ResourceRecord]]:
+    """
+    Extract resources for an app, optionally only those defined in `module`.
+    Each record is returned with its index in the app's model list so that
+    shards can be merged back into serial extraction order.
+    """
+
+    return [
+        (index, ResourceRecord.from_extractor(resource))
+        for index, resource in enumerate(worker_models.get_models(app))
+        if module is None or resource.name.rsplit(".", 1)[0] == module
+    ]
+
+
+# MAIN FUNCTION
+
+
+def extract_resources(
+    apps: List[str], workers: int, shard_by_module: bool = False
+) -> List[ResourceRecord]:
+    """
+    Extract resources for `apps` across a pool of `workers` processes, one
+    shard per app or, if `shard_by_module` is set, per model module. Records
+    are merged in the same order serial extraction would produce.
+    """
+
+    logger.info(f"Extracting marshall resources with {workers} workers...")
+
+    # a fresh interpreter per worker keeps `django` setup out of the server
+    # process and away from any inherited database connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=init_worker,
+    ) as pool:
+        shards = [(app, None) for app in apps]
+
+        if shard_by_module:
+            app_modules = pool.map(get_model_modules, apps)
+            shards = [
+                (app, module)
+                for app, modules in zip(apps, app_modules)
+                for module in modules
+            ]
+
+        futures = [pool.submit(extract_shard, *shard) for shard in shards]
+
+        # merge shard results per app in original model order
+        indexed = {app: [] for app in apps}
+        for (app, _), future in zip(shards, futures):
+            indexed[app].extend(future.result())
+
+    logger.info("...Marshall Resources Extracted")
+
+    return [
+        record
+        for app in apps
+        for _, record in sorted(indexed[app], key=lambda pair: pair[0])
+    ]
@@ -0,0 +1,112 @@
+from app.lib.logger import logger
+from app.summarize.lib.extractors import ResourceRecord
+from typing import List, Optional
+import os
+import pickle
+import struct
+import zlib
+
+# cache files start with a magic number and a format version. Bump
+# `cache_version` whenever the record classes or extraction output change,
+# so stale caches are ignored instead of loaded
+cache_magic = b"MSXC"
+cache_version = 2
+cache_header = struct.Struct(">4sH")
+
+# number of most recent commits to keep cached extractions for
+max_cached_commits = 5
+
+
+# HELPER FUNCTIONS
+
+
+def get_cache_path(cache_dir: str, commit_id: str) -> str:
+    """Get path of the cache file for a marshall commit."""
+
+    return os.path.join(cache_dir, f"{commit_id}.extraction")
+
+
+def prune_cache(cache_dir: str) -> None:
+    """Remove all but the most recently written cache files."""
+
+    paths = sorted(
+        (
+            os.path.join(cache_dir, name)
+            for name in os.listdir(cache_dir)
+            if name.endswith(".extraction")
+        ),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+
+    for path in paths[max_cached_commits:]:
+        os.remove(path)
+
+
+# MAIN FUNCTIONS
+
+
+def load_extraction_cache(
+    cache_dir: str, commit_id: str
+) -> Optional[List[ResourceRecord]]:
+    """
+    Load extracted resource records for a marshall commit, or return `None`
+    if there is no usable cache for it.
+    """
+
+    path = get_cache_path(cache_dir, commit_id)
+
+    try:
+        with open(path, "rb") as file:
+            magic, version = cache_header.unpack(file.read(cache_header.size))
+
+            if magic != cache_magic or version != cache_version:
+                logger.info(f"  ignoring stale extraction cache {path}")
+                return None
+
+            records = pickle.loads(zlib.decompress(file.read()))
+    except FileNotFoundError:
+        return None
+    # records pickled by other record classes fail to load with attribute,
+    # import or type errors, if `cache_version` was not bumped
+    except (
+        AttributeError,
+        EOFError,
+        ImportError,
+        OSError,
+        TypeError,
+        pickle.UnpicklingError,
+        struct.error,
+        zlib.error,
+    ) as e:
+        logger.warn(f"  unable to read extraction cache {path}: {e}")
+        return None
+
+    logger.info(f"  loaded {len(records)} resources from {path}")
+
+    return list(records)
+
+
+def save_extraction_cache(
+    cache_dir: str, commit_id: str, records: List[ResourceRecord]
+) -> None:
+    """Save extracted resource records for a marshall commit."""
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = get_cache_path(cache_dir, commit_id)
+    temp_path = f"{path}.tmp"
+
+    payload = zlib.compress(
+        pickle.dumps(tuple(records), protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+    # write to a temporary file first so an interrupted write never leaves
+    # a truncated cache behind
+    with open(temp_path, "wb") as file:
+        file.write(cache_header.pack(cache_magic, cache_version))
+        file.write(payload)
+    os.replace(temp_path, path)
+
+    prune_cache(cache_dir)
+
+    logger.info(f"  saved {len(records)} resources to {path}")
@@ -1,11 +1,31 @@
-from typing import Dict
+from itertools import islice
+from sqlalchemy import any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import ColumnElement
+from typing import Collection, Dict, Iterable, Iterator, List
 
 
-def extract_top_level_data(model: object) -> Dict:
-    """Get only top-level keys for a dict serializable object"""
+def extract_columns(model: object, columns: Iterable[str]) -> Dict:
+    """Get values of named column attributes of a model."""
 
-    return {
-        key: value
-        for (key, value) in model.__dict__.items()
-        if not isinstance(value, (list, dict))
-    }
+    return {column: getattr(model, column) for column in columns}
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most `size` items."""
+
+    iterator = iter(items)
+    chunk = list(islice(iterator, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def names_in(column: ColumnElement, names: Collection[str]) -> ColumnElement:
+    """
+    Get a `column = ANY(:names)` condition, which binds all names as a
+    single array parameter however many there are.
+    """
+
+    return column == any_(literal(list(names), ARRAY(column.type)))
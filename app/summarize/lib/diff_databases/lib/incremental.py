@@ -0,0 +1,104 @@
+from app.database import db
+from app.lib.logger import logger
+from app.summarize.lib.extractors import AbstractResource
+from app.summarize.models import CommitSnapshot, Relationship, Resource
+from os.path import join, normpath
+from typing import List, Optional, Set, Tuple
+import subprocess
+
+
+def get_previous_commit_id(current_commit_id: str) -> Optional[str]:
+    """
+    Get id of the last summarized marshall commit other than the current one,
+    if there is one.
+    """
+
+    snapshot = (
+        CommitSnapshot.query.filter(
+            CommitSnapshot.commit_id != current_commit_id
+        )
+        .order_by(CommitSnapshot.id.desc())
+        .first()
+    )
+
+    return snapshot.commit_id if snapshot else None
+
+
+def get_changed_files(
+    previous_commit_id: str, current_commit_id: str
+) -> Optional[Set[str]]:
+    """
+    Get paths (relative to the summarizer root, like module source paths) of
+    marshall files changed between two commits. Return `None` if the diff
+    can't be computed, e.g. if the previous commit is no longer in history.
+    """
+
+    cmd = (
+        "git -C ./marshall diff --name-only "
+        + f"{previous_commit_id} {current_commit_id}"
+    )
+
+    try:
+        output = subprocess.check_output(cmd.split(" "))
+    except subprocess.CalledProcessError:
+        logger.warn(
+            f"  unable to diff marshall commits {previous_commit_id} "
+            + f"and {current_commit_id}"
+        )
+        return None
+
+    return {
+        normpath(join("marshall", path))
+        for path in output.decode("utf-8").splitlines()
+        if path
+    }
+
+
+def select_affected_resources(
+    resources: List[AbstractResource], changed_files: Set[str]
+) -> Tuple[List[AbstractResource], Set[str]]:
+    """
+    Split resources into those affected by changes to `changed_files` and the
+    names of the rest, which can be carried over untouched.
+
+    A resource is affected if its class or one of its base classes is
+    defined in a changed file, or if it has (or previously had) a
+    relationship to a resource that is affected or was removed, since
+    reverse relationships are declared on the other resource.
+    """
+
+    current_names = {resource.name for resource in resources}
+    changed_names = {
+        resource.name
+        for resource in resources
+        if resource.source_files & changed_files
+    }
+    removed_names = {
+        name
+        for (name,) in db.session.query(Resource.name)
+        if name not in current_names
+    }
+
+    related_names = {
+        resource.name
+        for resource in resources
+        if any(
+            relationship.related_resource_name in changed_names
+            for relationship in resource.relationships
+        )
+    }
+    previously_related_names = {
+        name
+        for (name,) in db.session.query(Relationship.resource_name).filter(
+            Relationship.related_resource_name.in_(
+                changed_names | removed_names
+            )
+        )
+    }
+
+    affected_names = changed_names | related_names | previously_related_names
+
+    return (
+        [r for r in resources if r.name in affected_names],
+        current_names - affected_names,
+    )
@@ -0,0 +1,139 @@
+from app.database import db
+from app.lib.logger import logger
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.helpers import chunked
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    hash_text,
+    text_batch_size,
+)
+from app.summarize.models import Text
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import insert
+
+# text columns of summarizer tables moved to the text table, with the hash
+# column referencing each
+moved_text_columns = {
+    "resource": {"description": "description_hash"},
+    "field": {"description": "description_hash"},
+    "relationship": {"description": "description_hash"},
+    "metadata": {"value": "value_hash", "description": "description_hash"},
+}
+
+# hash columns of moved texts that are required
+required_hash_columns = {"metadata": ("value_hash",)}
+
+
+# HELPER FUNCTIONS
+
+
+def get_columns(table: str) -> set:
+    """Get the names of a table's columns in the database."""
+
+    return {
+        column["name"]
+        for column in inspect(db.session.connection()).get_columns(table)
+    }
+
+
+def backfill_texts(table: str, column: str, hash_column: str) -> int:
+    """
+    Store the distinct texts of a column in the text table and reference
+    them from its hash column, and get the number of distinct texts.
+    """
+
+    contents = [
+        content
+        for (content,) in db.session.execute(
+            text(
+                f"SELECT DISTINCT {column} FROM {table} "
+                + f"WHERE {column} IS NOT NULL"
+            )
+        )
+    ]
+
+    # hash texts as the refresh does, so rows written later match them
+    for batch in chunked(contents, text_batch_size):
+        db.session.execute(
+            insert(Text)
+            .values(
+                [
+                    {"hash": hash_text(content), "content": content}
+                    for content in batch
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["hash"])
+        )
+
+    db.session.execute(
+        text(
+            f"UPDATE {table} t SET {hash_column} = x.hash FROM text x "
+            + f"WHERE x.content = t.{column} AND t.{hash_column} IS NULL"
+        )
+    )
+
+    return len(contents)
+
+
+# MAIN FUNCTION
+
+
+def migrate_schema() -> None:
+    """
+    Migrate an existing database to the current summarizer schema, keeping
+    all its rows, instead of re-initializing it with `flask init-db`.
+
+    Missing tables (like `text`, `refresh_checkpoint` and `change_record`)
+    are created. Descriptions and metadata values are moved to the text
+    table: each distinct text is stored once, rows reference it through
+    their hash columns, and the old columns are dropped only once every
+    table is backfilled. Missing `content_hash` columns are added empty, so
+    the next refresh compares every subtree and stores their hashes. All
+    steps run in one transaction, and migrating again does nothing.
+    """
+
+    logger.info("Migrating Summarizer Schema...")
+
+    db.create_all()
+
+    for table, columns in moved_text_columns.items():
+        db.session.execute(
+            text(
+                f"ALTER TABLE {table} "
+                + "ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+            )
+        )
+
+        for hash_column in columns.values():
+            db.session.execute(
+                text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "
+                    + f"{hash_column} VARCHAR(64) REFERENCES text (hash)"
+                )
+            )
+
+        existing_columns = get_columns(table)
+        for column, hash_column in columns.items():
+            if column in existing_columns:
+                count = backfill_texts(table, column, hash_column)
+                logger.info(f"  {table}.{column}: {count} distinct texts")
+
+    # only drop moved columns once every table references its texts
+    for table, columns in moved_text_columns.items():
+        for column in columns:
+            db.session.execute(
+                text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}")
+            )
+
+    for table, hash_columns in required_hash_columns.items():
+        for hash_column in hash_columns:
+            db.session.execute(
+                text(
+                    f"ALTER TABLE {table} ALTER COLUMN {hash_column} "
+                    + "SET NOT NULL"
+                )
+            )
+
+    with tracer.span("commit", stage="migrate"):
+        db.session.commit()
+
+    logger.info("...Summarizer Schema Migrated")
@@ -0,0 +1,205 @@
+from app.database import db
+from app.lib.logger import logger
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.change_log import apply_changes
+from app.summarize.lib.diff_databases.lib.snapshot_history import (
+    get_current_state,
+    is_compressed_storage,
+)
+from app.summarize.lib.diff_databases.lib.snapshot_layout import (
+    current_layout,
+    in_layout,
+    to_keyed,
+)
+from app.summarize.models import CommitSnapshot, SnapshotCheckpoint
+from copy import deepcopy
+from jsonpatch import JsonPatch
+from sqlalchemy import text
+from typing import Any
+from sqlalchemy.orm import selectinload, undefer_group
+
+# columns added to snapshot tables since they were first created, with the
+# value of existing rows
+added_columns = {
+    "commit_snapshot": {
+        "changes": "JSONB",
+        "payload": "BYTEA",
+        "layout": "INTEGER NOT NULL DEFAULT 1",
+        "op_count": "INTEGER",
+        "byte_size": "INTEGER",
+        "is_stale": "BOOLEAN NOT NULL DEFAULT FALSE",
+    },
+    "snapshot_checkpoint": {
+        "payload": "BYTEA",
+        "layout": "INTEGER NOT NULL DEFAULT 1",
+        "byte_size": "INTEGER",
+    },
+}
+
+# columns of snapshot tables left empty when payloads are compressed
+payload_columns = {"commit_snapshot": "diff", "snapshot_checkpoint": "state"}
+
+
+# HELPER FUNCTIONS
+
+
+def add_snapshot_columns() -> None:
+    """
+    Create missing snapshot tables and add missing columns to existing ones,
+    so snapshots taken before them can be migrated in place.
+    """
+
+    db.create_all()
+
+    for table, columns in added_columns.items():
+        for column, definition in columns.items():
+            db.session.execute(
+                text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} "
+                    + definition
+                )
+            )
+
+    for table, column in payload_columns.items():
+        db.session.execute(
+            text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL")
+        )
+
+    with tracer.span("commit", stage="migrate"):
+        db.session.commit()
+
+
+# MAIN FUNCTION
+
+
+def migrate_snapshots() -> int:
+    """
+    Migrate the diffs of all commit snapshots and the states of all
+    snapshot checkpoints to the name-keyed layout and to the storage set by
+    `SNAPSHOT_STORAGE`, and get the number of migrated snapshots.
+
+    The snapshot chain is replayed in order, and each diff of a list
+    document is replaced by the diff between the name-keyed states before
+    and after it, so later replays apply patches proportional to the
+    resources that changed. Change records are independent of the layout,
+    so are kept as is.
+
+    Snapshots taken before change records existed (without `changes`) hold
+    the state before their commit's refresh, while all others hold the
+    state after it. Legacy snapshots are shifted to the state before the
+    next snapshot's refresh, or the current state for the last one, and
+    their checkpoints are discarded. If the snapshot after a legacy one was
+    bridged before migrating, the state before its refresh is lost, so the
+    legacy snapshot takes the bridged state instead.
+
+    Migrating again does nothing, unless the storage setting changed.
+    """
+
+    logger.info("Migrating Commit Snapshots to the Name-Keyed Layout...")
+
+    add_snapshot_columns()
+
+    migrated = 0
+    compressed = is_compressed_storage()
+    legacy_ids = []
+
+    # state in the layouts of the stored diffs, as legacy diffs refer to
+    # entries by their index in the original lists
+    state = {}
+    previous_state = {}
+
+    def rediff(snapshot: CommitSnapshot, next_state: Any) -> None:
+        """
+        Store the diff from the previous snapshot's state to a snapshot's
+        name-keyed state (before its change records).
+        """
+
+        nonlocal migrated
+
+        snapshot.store_diff(
+            JsonPatch.from_diff(previous_state, to_keyed(next_state)).patch,
+            compressed,
+        )
+        snapshot.layout = current_layout
+        migrated += 1
+
+    snapshots = CommitSnapshot.query.options(
+        undefer_group("payload"),
+        undefer_group("changes"),
+        selectinload(CommitSnapshot.change_records),
+    ).order_by(CommitSnapshot.id)
+
+    # legacy snapshot waiting for the state after its commit's refresh
+    pending = None
+
+    for snapshot in snapshots:
+        diff = snapshot.decoded_diff
+
+        if diff:
+            state = JsonPatch(deepcopy(diff)).apply(
+                in_layout(state, snapshot.layout), in_place=True
+            )
+
+        # the state before this snapshot's refresh is the state after the
+        # pending legacy snapshot's refresh, which now shifts to it
+        is_shifted = pending is not None
+        if is_shifted:
+            rediff(pending, state)
+            pending.changes = []
+            previous_state = deepcopy(to_keyed(state))
+            pending = None
+
+        if snapshot.changes is None:
+            legacy_ids.append(snapshot.id)
+            pending = snapshot
+            continue
+
+        if snapshot.layout != current_layout or is_shifted:
+            rediff(snapshot, state)
+        elif (
+            snapshot.op_count is None
+            or (snapshot.payload is not None) != compressed
+        ):
+            snapshot.store_diff(diff, compressed)
+            migrated += 1
+
+        changes = snapshot.logged_changes
+
+        if changes:
+            state = apply_changes(to_keyed(state), changes)
+
+        # copy the state, as replaying the next snapshot changes it in place
+        previous_state = deepcopy(to_keyed(state))
+
+    # the last legacy snapshot was taken before the latest refresh
+    if pending is not None:
+        rediff(pending, get_current_state())
+        pending.changes = []
+
+    # checkpoints of legacy snapshots hold states before their refresh
+    SnapshotCheckpoint.query.filter(
+        SnapshotCheckpoint.snapshot_id.in_(legacy_ids)
+    ).delete(synchronize_session=False)
+
+    checkpoints = SnapshotCheckpoint.query.options(undefer_group("payload"))
+
+    for checkpoint in checkpoints:
+        if (
+            checkpoint.layout != current_layout
+            or checkpoint.byte_size is None
+            or (checkpoint.payload is not None) != compressed
+        ):
+            checkpoint.store_state(
+                to_keyed(checkpoint.decoded_state), compressed
+            )
+            checkpoint.layout = current_layout
+
+    with tracer.span("commit", stage="migrate", operations=migrated):
+        db.session.commit()
+
+    logger.info(
+        f"...{migrated} Commit Snapshots Migrated, "
+        + f"{len(legacy_ids)} Shifted"
+    )
+
+    return migrated
@@ -0,0 +1,186 @@
+from app.database import db
+from app.lib.logger import logger
+from app.lib.tracing import tracer
+from app.summarize.models import RefreshCheckpoint
+from sqlalchemy import func, update
+from typing import Any, Optional
+
+
+# HELPER FUNCTIONS
+
+
+def has_unfinished_checkpoint(commit_id: str) -> bool:
+    """Check if a refresh of a marshall commit was interrupted."""
+
+    checkpoint_query = RefreshCheckpoint.query.filter(
+        RefreshCheckpoint.commit_id == commit_id,
+        RefreshCheckpoint.is_complete.is_(False),
+    )
+
+    return db.session.query(checkpoint_query.exists()).scalar()
+
+
+def has_interrupted_refresh(commit_id: str) -> bool:
+    """
+    Check if a refresh of any marshall commit other than `commit_id` was
+    interrupted and never completed.
+    """
+
+    checkpoint_query = RefreshCheckpoint.query.filter(
+        RefreshCheckpoint.commit_id != commit_id,
+        RefreshCheckpoint.is_complete.is_(False),
+    )
+
+    return db.session.query(checkpoint_query.exists()).scalar()
+
+
+# REFRESH PROGRESS CLASS
+
+
+class RefreshProgress:
+    """
+    Persisted progress of the current refresh, recorded in a
+    `RefreshCheckpoint` per marshall commit, so an interrupted refresh
+    resumes from the last finished chunk instead of starting over.
+
+    A refresh runs in chunks of resources (a single chunk unless
+    `REFRESH_CHUNK_SIZE` is set), each updated stage by stage. The
+    checkpoint stores how many chunks finished and which stages of the next
+    chunk finished. On resume, finished chunks are skipped and the
+    interrupted chunk is refreshed again without skipping unchanged
+    subtrees, since a resource's content hash may have been committed
+    before its children were. If the chunk size changed since the
+    interrupted refresh, no chunk is skipped, and no chunk skips unchanged
+    subtrees.
+
+    If the interrupted refresh was of another commit, e.g. because marshall
+    moved on before the retry, its partially written subtrees may be
+    unchanged between both commits. The whole refresh then repairs them,
+    skipping no unchanged subtrees, and completing it also completes the
+    interrupted checkpoints. Call `start` at the start of a refresh.
+    """
+
+    def __init__(self) -> None:
+        self.start(None)
+
+    def start(self, commit_id: Optional[str], chunk_size: int = 0) -> None:
+        """
+        Load or create the checkpoint of a commit. A refresh without commit
+        id, such as a dry run, records no progress.
+        """
+
+        self.commit_id = commit_id
+        self.is_repairing = False
+        self.__finished_chunks = 0
+        self.__unsafe_chunks = 0
+
+        if commit_id is None:
+            return
+
+        if has_interrupted_refresh(commit_id):
+            logger.info(
+                f"Refreshing {commit_id} without skipping unchanged "
+                + "subtrees, as a refresh of another commit was interrupted"
+            )
+            self.is_repairing = True
+
+        checkpoint = RefreshCheckpoint.query.filter_by(
+            commit_id=commit_id
+        ).first()
+
+        if checkpoint is None:
+            checkpoint = RefreshCheckpoint(
+                commit_id=commit_id, chunk_size=chunk_size
+            )
+            db.session.add(checkpoint)
+        elif checkpoint.is_complete:
+            # forced refreshes of a summarized commit start over
+            checkpoint.chunk = 0
+            checkpoint.is_complete = False
+        elif checkpoint.chunk_size != chunk_size:
+            logger.info(
+                f"Resuming refresh of {commit_id} from the start, as chunk "
+                + f"size changed from {checkpoint.chunk_size}"
+            )
+            checkpoint.chunk = 0
+            self.__unsafe_chunks = float("inf")
+        else:
+            logger.info(
+                f"Resuming refresh of {commit_id} from chunk "
+                + f"{checkpoint.chunk + 1}, after stages {checkpoint.stages}"
+            )
+            self.__finished_chunks = checkpoint.chunk
+            self.__unsafe_chunks = checkpoint.chunk + 1
+
+        if self.is_repairing:
+            self.__unsafe_chunks = float("inf")
+
+        checkpoint.chunk_size = chunk_size
+        checkpoint.stages = []
+        with tracer.span("commit", stage="progress"):
+            db.session.commit()
+
+    def __update(self, **values: Any) -> None:
+        """Update the checkpoint of the current refresh and commit."""
+
+        if self.commit_id is None:
+            return
+
+        db.session.execute(
+            update(RefreshCheckpoint)
+            .where(RefreshCheckpoint.commit_id == self.commit_id)
+            .values(**values)
+        )
+        with tracer.span("commit", stage="progress"):
+            db.session.commit()
+
+    def is_chunk_finished(self, index: int) -> bool:
+        """Check if a chunk was finished by an interrupted refresh."""
+
+        return index < self.__finished_chunks
+
+    def can_skip_unchanged(self, index: int) -> bool:
+        """
+        Check if a chunk can skip subtrees with unchanged content hashes.
+        """
+
+        return index >= self.__unsafe_chunks
+
+    def finish_stage(self, stage: str) -> None:
+        """
+        Record a stage of the current chunk as finished. Stages running
+        concurrently append to the checkpoint atomically.
+        """
+
+        self.__update(
+            stages=RefreshCheckpoint.stages.op("||")(
+                func.jsonb_build_array(stage)
+            )
+        )
+
+    def finish_chunk(self, index: int) -> None:
+        """Record a chunk as finished."""
+
+        self.__update(chunk=index + 1, stages=[])
+
+    def complete(self) -> None:
+        """
+        Record the refresh as complete, along with interrupted refreshes of
+        other commits it repaired.
+        """
+
+        if self.commit_id is not None and self.is_repairing:
+            db.session.execute(
+                update(RefreshCheckpoint)
+                .where(
+                    RefreshCheckpoint.commit_id != self.commit_id,
+                    RefreshCheckpoint.is_complete.is_(False),
+                )
+                .values(is_complete=True)
+            )
+
+        self.__update(is_complete=True)
+
+
+# progress of the current refresh, restarted once per refresh
+refresh_progress = RefreshProgress()
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator
+import threading
+
+
+class RefreshReport:
+    """
+    Planned or applied changes per entity type and timings per step of the
+    current (or last) refresh.
+
+    In a dry run, update stages plan their changes as usual but the bulk
+    writer and text dictionary discard all writes, so the report is the
+    only result. Call `start` at the start of a refresh. Stages running
+    concurrently can record into the same report.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.start(False)
+
+    def start(self, dry_run: bool) -> None:
+        """Reset the report for a new refresh."""
+
+        self.dry_run = dry_run
+        self.__changes: Dict[str, Dict[str, int]] = {}
+        self.__timings: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, step: str) -> Iterator[None]:
+        """Time a step of the refresh, adding to earlier runs of the step."""
+
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            with self.__lock:
+                self.__timings[step] = (
+                    self.__timings.get(step, 0.0) + perf_counter() - start
+                )
+
+    def record(self, entity: str, counter: Dict[str, int]) -> None:
+        """Add change counts of an update stage for an entity type."""
+
+        with self.__lock:
+            changes = self.__changes.setdefault(entity, {})
+
+            for key, count in counter.items():
+                changes[key] = changes.get(key, 0) + count
+
+    def to_dict(self) -> dict:
+        """Get the report in `dict` format."""
+
+        return {
+            "dry_run": self.dry_run,
+            "changes": self.__changes,
+            "timings": {
+                step: round(seconds, 3)
+                for step, seconds in self.__timings.items()
+            },
+        }
+
+
+# report shared by all update stages, reset once per refresh
+refresh_report = RefreshReport()
@@ -0,0 +1,134 @@
+from app.summarize.lib.diff_databases.lib.change_log import (
+    document_children,
+    document_keys,
+)
+from app.summarize.lib.diff_databases.lib.state_cache import (
+    get_cached_state,
+    get_snapshot_key,
+)
+from typing import Any, Dict, List, Optional
+
+# key of each entity in commit diffs
+diff_keys = {
+    "resource": "resources",
+    "field": "fields",
+    "relationship": "relationships",
+    "metadata": "metadata",
+}
+
+
+# HELPER FUNCTIONS
+
+
+def flatten_state(state: Dict[str, Dict]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Index the entries of every entity in a name-keyed snapshot state by
+    name, without their children.
+    """
+
+    entries = {entity: {} for entity in document_keys}
+
+    def add_entry(entity: str, entry: Dict) -> None:
+        entries[entity][entry["name"]] = {
+            key: entry.get(key) for key in document_keys[entity]
+        }
+
+        for key, child_entity in document_children[entity].items():
+            for child in entry.get(key, {}).values():
+                add_entry(child_entity, child)
+
+    for resource in state.values():
+        add_entry("resource", resource)
+
+    return entries
+
+
+def diff_entries(
+    prev_entries: Dict[str, Dict], next_entries: Dict[str, Dict]
+) -> Dict[str, List]:
+    """
+    Get added and removed entries, and the changed values of entries in
+    both, sorted by name.
+    """
+
+    changed = []
+    for name in sorted(prev_entries.keys() & next_entries.keys()):
+        prev_entry, next_entry = prev_entries[name], next_entries[name]
+        changes = {
+            key: {"from": prev_entry[key], "to": next_entry[key]}
+            for key in next_entry
+            if prev_entry.get(key) != next_entry[key]
+        }
+
+        if changes:
+            changed.append({"name": name, "changes": changes})
+
+    return {
+        "added": [
+            next_entries[name]
+            for name in sorted(next_entries.keys() - prev_entries.keys())
+        ],
+        "removed": [
+            prev_entries[name]
+            for name in sorted(prev_entries.keys() - next_entries.keys())
+        ],
+        "changed": changed,
+    }
+
+
+def diff_states(
+    prev_state: Dict[str, Dict], next_state: Dict[str, Dict]
+) -> Dict[str, Dict]:
+    """
+    Get added, removed and changed resources, fields, relationships and
+    metadata between two snapshot states.
+    """
+
+    prev_entries = flatten_state(prev_state)
+    next_entries = flatten_state(next_state)
+
+    return {
+        diff_key: diff_entries(prev_entries[entity], next_entries[entity])
+        for entity, diff_key in diff_keys.items()
+    }
+
+
+# MAIN FUNCTION
+
+
+def get_commit_diff(
+    from_commit_id: str, to_commit_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Get added, removed and changed resources, fields, relationships and
+    metadata from one marshall commit to another, or `None` if either
+    commit has no snapshot.
+
+    Both states come from the state cache, or are reconstructed from their
+    nearest checkpoints. If the later state is missing, it is reconstructed
+    by composing only the snapshots between the two commits onto the
+    earlier state, whenever no checkpoint is closer.
+    """
+
+    from_key = get_snapshot_key(from_commit_id)
+    to_key = get_snapshot_key(to_commit_id)
+
+    if from_key is None or to_key is None:
+        return None
+
+    # reconstruct the earlier state first, to compose the later one from it
+    earlier_key, later_key = sorted([from_key, to_key])
+    earlier_state = get_cached_state(earlier_key)
+    later_state = get_cached_state(later_key, (earlier_key[0], earlier_state))
+
+    from_state, to_state = (
+        (earlier_state, later_state)
+        if from_key == earlier_key
+        else (later_state, earlier_state)
+    )
+
+    return {
+        "from": from_commit_id,
+        "to": to_commit_id,
+        **diff_states(from_state, to_state),
+    }
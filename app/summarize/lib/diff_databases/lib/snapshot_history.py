@@ -0,0 +1,266 @@
+from app.database import db
+from app.lib.logger import logger
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.change_log import apply_changes
+from app.summarize.lib.diff_databases.lib.snapshot_layout import (
+    current_layout,
+    in_layout,
+    to_keyed,
+)
+from app.summarize.lib.extractors.summarizer import SummarizerResource
+from app.summarize.models import (
+    ChangeRecord,
+    CommitSnapshot,
+    Resource,
+    SnapshotCheckpoint,
+)
+from copy import deepcopy
+from flask import current_app
+from jsonpatch import JsonPatch
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload, undefer_group
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# default number of snapshots after which a checkpoint is taken
+default_checkpoint_interval = 50
+
+# default number of replayed patch operations and change records after
+# which a checkpoint is taken
+default_checkpoint_budget = 50000
+
+# default storage of snapshot payloads, as `jsonb` or `compressed`
+default_storage = "jsonb"
+
+
+# HELPER FUNCTIONS
+
+
+def is_compressed_storage() -> bool:
+    """
+    Check if snapshot payloads are stored compressed, as set by the
+    `SNAPSHOT_STORAGE` setting.
+    """
+
+    storage = current_app.config.get("SNAPSHOT_STORAGE", default_storage)
+
+    return storage == "compressed"
+
+
+def get_current_state() -> Dict[str, Dict]:
+    """Get the name-keyed state of the stored summarizer resources."""
+
+    return to_keyed(
+        [
+            SummarizerResource(resource).__dict__
+            for resource in Resource.query.all()
+        ]
+    )
+
+
+def replay_snapshots(
+    snapshots: Iterable[CommitSnapshot], state: Any = None
+) -> Any:
+    """
+    Get the name-keyed state of summarizer resources after a chain of
+    snapshots, starting from `state` (or nothing), by applying each
+    snapshot's state diff and then its change records.
+
+    Snapshots not yet migrated to the name-keyed layout hold diffs of list
+    documents, so the state is converted to each diff's layout before
+    applying it.
+    """
+
+    state = {} if state is None else state
+
+    for snapshot in snapshots:
+        diff = snapshot.decoded_diff
+
+        if diff:
+            # copy the stored diff, as applied values are not copied
+            state = JsonPatch(deepcopy(diff)).apply(
+                in_layout(state, snapshot.layout), in_place=True
+            )
+
+        changes = snapshot.logged_changes
+
+        if changes:
+            state = apply_changes(to_keyed(state), changes)
+
+    return to_keyed(state)
+
+
+def get_nearest_checkpoint(snapshot_id: int) -> Optional[SnapshotCheckpoint]:
+    """Get the latest checkpoint taken at or before a snapshot."""
+
+    return (
+        SnapshotCheckpoint.query.filter(
+            SnapshotCheckpoint.snapshot_id <= snapshot_id
+        )
+        .order_by(SnapshotCheckpoint.snapshot_id.desc())
+        .first()
+    )
+
+
+def get_snapshots_after(checkpoint: Optional[SnapshotCheckpoint]) -> Any:
+    """Get a query of snapshots after a checkpoint (or all), in order."""
+
+    query = CommitSnapshot.query.order_by(CommitSnapshot.id)
+
+    if checkpoint is not None:
+        query = query.filter(CommitSnapshot.id > checkpoint.snapshot_id)
+
+    return query
+
+
+def count_operations(query: Any) -> int:
+    """
+    Count the patch operations and change records of a query of snapshots,
+    without loading them.
+    """
+
+    subquery = query.with_entities(
+        func.coalesce(
+            CommitSnapshot.op_count,
+            func.jsonb_array_length(CommitSnapshot.diff),
+        ).label("diff"),
+        func.coalesce(
+            func.jsonb_array_length(CommitSnapshot.changes), 0
+        ).label("changes"),
+        func.coalesce(
+            select(func.sum(ChangeRecord.count))
+            .where(ChangeRecord.snapshot_id == CommitSnapshot.id)
+            .scalar_subquery(),
+            0,
+        ).label("records"),
+    ).subquery()
+
+    return db.session.query(
+        func.coalesce(
+            func.sum(
+                subquery.c.diff + subquery.c.changes + subquery.c.records
+            ),
+            0,
+        )
+    ).scalar()
+
+
+# MAIN FUNCTIONS
+
+
+def get_snapshot_state(
+    snapshot: CommitSnapshot, base: Optional[Tuple[int, Any]] = None
+) -> Any:
+    """
+    Get the name-keyed state of summarizer resources as of a snapshot,
+    replaying only the snapshots after its nearest checkpoint. If `base`
+    (the id of an earlier snapshot and the state as of it) is closer than
+    the nearest checkpoint, only the snapshots after `base` are replayed
+    instead.
+    """
+
+    checkpoint = get_nearest_checkpoint(snapshot.id)
+
+    # load payloads along with the snapshots, though only diffs with
+    # operations are decoded
+    snapshots = (
+        CommitSnapshot.query.options(
+            undefer_group("payload"),
+            undefer_group("changes"),
+            selectinload(CommitSnapshot.change_records),
+        )
+        .order_by(CommitSnapshot.id)
+        .filter(CommitSnapshot.id <= snapshot.id)
+    )
+
+    # copy the stored or base state, as replaying changes it in place
+    if (
+        base is not None
+        and base[0] <= snapshot.id
+        and (checkpoint is None or base[0] > checkpoint.snapshot_id)
+    ):
+        start_id, state = base[0], deepcopy(base[1])
+    elif checkpoint is not None:
+        start_id, state = (
+            checkpoint.snapshot_id,
+            deepcopy(checkpoint.decoded_state),
+        )
+    else:
+        start_id, state = None, None
+
+    if start_id is not None:
+        snapshots = snapshots.filter(CommitSnapshot.id > start_id)
+
+    return replay_snapshots(snapshots, state)
+
+
+def get_commit_state(commit_id: str) -> Optional[Any]:
+    """
+    Get the name-keyed state of summarizer resources as of a marshall
+    commit, or `None` if the commit has no snapshot.
+    """
+
+    snapshot = CommitSnapshot.query.filter_by(commit_id=commit_id).first()
+
+    if snapshot is None:
+        return None
+
+    return get_snapshot_state(snapshot)
+
+
+def discard_checkpoints(snapshot_id: int) -> None:
+    """
+    Delete checkpoints taken at or after a snapshot, e.g. when changes are
+    appended to it.
+    """
+
+    SnapshotCheckpoint.query.filter(
+        SnapshotCheckpoint.snapshot_id >= snapshot_id
+    ).delete(synchronize_session=False)
+
+
+def take_snapshot_checkpoint() -> bool:
+    """
+    Store the full state as of the latest snapshot as a checkpoint, if at
+    least `SNAPSHOT_CHECKPOINT_INTERVAL` snapshots, or more than
+    `SNAPSHOT_CHECKPOINT_BUDGET` patch operations and change records, were
+    taken since the last checkpoint. Return whether a checkpoint was taken.
+    """
+
+    latest_snapshot = CommitSnapshot.query.order_by(
+        CommitSnapshot.id.desc()
+    ).first()
+
+    if latest_snapshot is None:
+        return False
+
+    checkpoint = get_nearest_checkpoint(latest_snapshot.id)
+    if (
+        checkpoint is not None
+        and checkpoint.snapshot_id == latest_snapshot.id
+    ):
+        return False
+
+    pending = get_snapshots_after(checkpoint)
+    interval = current_app.config.get(
+        "SNAPSHOT_CHECKPOINT_INTERVAL", default_checkpoint_interval
+    )
+    budget = current_app.config.get(
+        "SNAPSHOT_CHECKPOINT_BUDGET", default_checkpoint_budget
+    )
+
+    if pending.count() < interval and count_operations(pending) <= budget:
+        return False
+
+    logger.info(f"Taking Snapshot Checkpoint at {latest_snapshot.commit_id}")
+
+    checkpoint = SnapshotCheckpoint(
+        snapshot_id=latest_snapshot.id, layout=current_layout
+    )
+    checkpoint.store_state(
+        get_snapshot_state(latest_snapshot), is_compressed_storage()
+    )
+    db.session.add(checkpoint)
+    with tracer.span("commit", stage="checkpoint"):
+        db.session.commit()
+
+    return True
@@ -0,0 +1,87 @@
+from app.summarize.lib.diff_databases.lib.change_log import (
+    document_children,
+    document_keys,
+)
+from typing import Any, Dict, List
+
+# layouts of snapshot documents: lists of serialized resources, each holding
+# lists of fields and relationships (as `SummarizerResource` serializes
+# them), or resources keyed by name, each holding fields and relationships
+# keyed by name
+LIST_LAYOUT = 1
+KEYED_LAYOUT = 2
+
+# layout of snapshot documents taken from now on
+current_layout = KEYED_LAYOUT
+
+
+# HELPER FUNCTIONS
+
+
+def keyed_entry(entity: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a name-keyed document entry from a list document entry, in stable
+    key order.
+    """
+
+    keyed = {key: entry.get(key) for key in document_keys[entity]}
+
+    for key, child_entity in document_children[entity].items():
+        keyed[key] = {
+            child["name"]: keyed_entry(child_entity, child)
+            for child in sorted(entry.get(key, []), key=lambda c: c["name"])
+        }
+
+    return keyed
+
+
+def list_entry(entity: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Get a list document entry from a name-keyed document entry."""
+
+    listed = {key: entry.get(key) for key in document_keys[entity]}
+
+    for key, child_entity in document_children[entity].items():
+        listed[key] = [
+            list_entry(child_entity, entry[key][name])
+            for name in sorted(entry.get(key, {}))
+        ]
+
+    return listed
+
+
+# MAIN FUNCTIONS
+
+
+def to_keyed(document: Any) -> Dict[str, Dict]:
+    """
+    Get a snapshot document in the name-keyed layout. Name-keyed documents
+    are returned as is.
+    """
+
+    if not isinstance(document, list):
+        return document
+
+    return {
+        resource["name"]: keyed_entry("resource", resource)
+        for resource in sorted(document, key=lambda r: r["name"])
+    }
+
+
+def to_list(document: Any) -> List[Dict]:
+    """
+    Get a snapshot document in the list layout, sorted by name. List
+    documents are returned as is.
+    """
+
+    if isinstance(document, list):
+        return document
+
+    return [
+        list_entry("resource", document[name]) for name in sorted(document)
+    ]
+
+
+def in_layout(document: Any, layout: int) -> Any:
+    """Get a snapshot document in a layout."""
+
+    return to_list(document) if layout == LIST_LAYOUT else to_keyed(document)
@@ -0,0 +1,122 @@
+from app.database import db
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from flask import Flask, current_app
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# a stage is called with the results of all stages finished so far
+Stage = Callable[[Dict[str, Any]], Any]
+
+
+# HELPER FUNCTIONS
+
+
+def run_in_app_context(
+    app: Flask, stage: Stage, results: Dict[str, Any]
+) -> Any:
+    """
+    Run a stage in its own app context, so it uses its own session and
+    pooled connection, and release the session once it finishes.
+    """
+
+    with app.app_context():
+        try:
+            return stage(results)
+        finally:
+            db.session.remove()
+
+
+# STAGE GRAPH CLASS
+
+
+class StageGraph:
+    """
+    Refresh stages with explicitly declared ordering constraints.
+
+    Each stage runs only after all stages it is declared `after` have
+    finished, e.g. so rows are written after the rows they reference by
+    foreign key. With more than one worker, stages whose constraints are
+    met run concurrently in a thread pool, each on its own session.
+    """
+
+    def __init__(self) -> None:
+        self.__stages: Dict[str, Tuple[Stage, Tuple[str, ...]]] = {}
+
+    def add(self, name: str, stage: Stage, after: Iterable[str] = ()) -> None:
+        """Add a stage, to run after all stages named in `after`."""
+
+        after = tuple(after)
+        unknown = [
+            dependency
+            for dependency in after
+            if dependency not in self.__stages
+        ]
+
+        # only allow constraints on earlier stages, so stages are always in a
+        # valid order and the graph can have no cycles
+        if unknown:
+            raise ValueError(
+                f"stage '{name}' depends on unknown stages {unknown}"
+            )
+
+        self.__stages[name] = (stage, after)
+
+    def __ready(
+        self, results: Dict[str, Any], started: Iterable[str]
+    ) -> List[str]:
+        """Get names of stages not yet started whose constraints are met."""
+
+        return [
+            name
+            for name, (_, after) in self.__stages.items()
+            if name not in started
+            and all(dependency in results for dependency in after)
+        ]
+
+    def run(self, workers: int = 1) -> Dict[str, Any]:
+        """
+        Run all stages and get their results by name. With one worker,
+        stages run one at a time in the order they were added, in the
+        current app context.
+        """
+
+        results: Dict[str, Any] = {}
+
+        if workers <= 1:
+            for name, (stage, _) in self.__stages.items():
+                results[name] = stage(results)
+
+            return results
+
+        app = current_app._get_current_object()
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(results) < len(self.__stages):
+                for name in self.__ready(
+                    results, [*results, *running.values()]
+                ):
+                    stage = self.__stages[name][0]
+                    future = executor.submit(
+                        run_in_app_context, app, stage, dict(results)
+                    )
+                    running[future] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    name = running.pop(future)
+
+                    # wait for running stages before failing, so no stage
+                    # is left writing after the refresh is abandoned
+                    if future.exception() is not None:
+                        wait(running)
+                        raise future.exception()
+
+                    results[name] = future.result()
+
+        return results
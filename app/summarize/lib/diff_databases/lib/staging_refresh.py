@@ -0,0 +1,383 @@
+from app.database import db
+from app.lib.logger import logger
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
+)
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    hash_text,
+    text_columns,
+)
+from app.summarize.lib.extractors import (
+    FieldRecord,
+    MetadataRecord,
+    RelationshipRecord,
+    ResourceRecord,
+)
+from app.summarize.lib.extractors.records import Record
+from app.summarize.models import Field, Metadata, Relationship, Resource, Text
+from io import StringIO
+from sqlalchemy import text
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+# change log operations of each kind of change
+change_ops = {
+    "archived": "archive",
+    "created": "create",
+    "deleted": "delete",
+    "unarchived": "unarchive",
+    "updated": "update",
+}
+
+# log actions of each kind of change
+change_actions = {
+    "archived": "ARCHIVE",
+    "created": "CREATE",
+    "deleted": "DELETE",
+    "unarchived": "UNARCHIVE",
+    "updated": "UPDATE",
+}
+
+# characters escaped in `COPY` text format values
+copy_escapes = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+# record class of each staged model, in the order they are staged
+record_classes = {
+    Resource: ResourceRecord,
+    Field: FieldRecord,
+    Metadata: MetadataRecord,
+    Relationship: RelationshipRecord,
+}
+
+
+# HELPER FUNCTIONS
+
+
+def format_copy_value(value: Any) -> str:
+    """Format a value for `COPY` text format."""
+
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+
+    return str(value).translate(copy_escapes)
+
+
+def copy_rows(table: str, columns: List[str], rows: Iterable[Tuple]) -> None:
+    """Bulk load rows into a table with a single `COPY`."""
+
+    buffer = StringIO()
+    for row in rows:
+        buffer.write("\t".join(format_copy_value(v) for v in row) + "\n")
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer
+    )
+    cursor.close()
+
+
+def create_staging_table(model: Any, columns: List[str]) -> str:
+    """
+    Create a temporary staging table with the named columns of a model's
+    table, dropped when the transaction commits.
+    """
+
+    table = f"staging_{model.__tablename__}"
+
+    db.session.execute(
+        text(
+            f"CREATE TEMP TABLE {table} ON COMMIT DROP AS "
+            + f"SELECT {', '.join(columns)} FROM {model.__tablename__} "
+            + "WITH NO DATA"
+        )
+    )
+
+    return table
+
+
+def execute_names(sql: str) -> List[str]:
+    """Execute a statement returning names and get the names."""
+
+    return [name for (name,) in db.session.execute(text(sql))]
+
+
+def log_names(model: Any, action: str, names: List[str]) -> None:
+    """Log a change to each named row, as the update stages do."""
+
+    for name in sorted(names):
+        logger.info(f"  {model.__name__}[{action}] {name}")
+
+
+# STAGING TABLE CLASS
+
+
+class StagingTable:
+    """
+    Extracted rows of a model loaded into a staging table, merged into the
+    model's table with set-based statements. Records of the rows are indexed
+    by name, to log the data of changed rows.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        record_class: Type[Record],
+        rows: List[Dict],
+        records: Dict[str, Record],
+    ) -> None:
+        self.model = model
+        self.records = records
+        self.table = model.__tablename__
+        self.columns = [
+            text_columns.get(column, column)
+            for column in record_class.columns
+        ] + ["content_hash"]
+
+        self.staging_table = create_staging_table(model, self.columns)
+
+        with tracer.span("copy", model=model.__name__, rows=len(rows)):
+            copy_rows(
+                self.staging_table,
+                self.columns,
+                (tuple(row[c] for c in self.columns) for row in rows),
+            )
+
+    @property
+    def __data_columns(self) -> List[str]:
+        """Get staged columns compared to find modified rows."""
+
+        return [c for c in self.columns if c not in ("name", "content_hash")]
+
+    def __set_clause(self) -> str:
+        """Get a `SET` clause copying all staged columns."""
+
+        return ", ".join(
+            [f"{c} = s.{c}" for c in self.columns if c != "name"]
+            + ["date_modified = CURRENT_TIMESTAMP"]
+        )
+
+    def __is_modified(self) -> str:
+        """Get a condition true where staged columns differ from stored."""
+
+        columns = self.__data_columns
+
+        return (
+            f"({', '.join(f't.{c}' for c in columns)}) IS DISTINCT FROM "
+            + f"({', '.join(f's.{c}' for c in columns)})"
+        )
+
+    def update(self, archivable: bool) -> List[str]:
+        """Update modified rows and get their names."""
+
+        names = execute_names(
+            f"UPDATE {self.table} t SET {self.__set_clause()} "
+            + f"FROM {self.staging_table} s WHERE t.name = s.name "
+            + ("AND NOT t.is_archived " if archivable else "")
+            + f"AND {self.__is_modified()} RETURNING t.name"
+        )
+
+        # store content hashes of otherwise unmodified rows without
+        # counting them as updated
+        db.session.execute(
+            text(
+                f"UPDATE {self.table} t SET content_hash = s.content_hash "
+                + f"FROM {self.staging_table} s WHERE t.name = s.name "
+                + "AND t.content_hash IS DISTINCT FROM s.content_hash"
+            )
+        )
+
+        return names
+
+    def unarchive(self) -> List[str]:
+        """Unarchive and update restored rows and get their names."""
+
+        return execute_names(
+            f"UPDATE {self.table} t SET {self.__set_clause()}, "
+            + f"is_archived = false FROM {self.staging_table} s "
+            + "WHERE t.name = s.name AND t.is_archived RETURNING t.name"
+        )
+
+    def create(self, archivable: bool) -> List[str]:
+        """Insert new rows and get their names."""
+
+        columns = self.columns + ["date_created", "date_modified"]
+        values = [f"s.{c}" for c in self.columns] + [
+            "CURRENT_TIMESTAMP",
+            "CURRENT_TIMESTAMP",
+        ]
+
+        if archivable:
+            columns.append("is_archived")
+            values.append("false")
+
+        return execute_names(
+            f"INSERT INTO {self.table} ({', '.join(columns)}) "
+            + f"SELECT {', '.join(values)} FROM {self.staging_table} s "
+            + f"WHERE NOT EXISTS (SELECT 1 FROM {self.table} t "
+            + "WHERE t.name = s.name) RETURNING name"
+        )
+
+    def archive(self) -> List[str]:
+        """Archive rows missing from staging and get their names."""
+
+        return execute_names(
+            f"UPDATE {self.table} t SET is_archived = true, "
+            + "date_modified = CURRENT_TIMESTAMP WHERE NOT t.is_archived "
+            + f"AND NOT EXISTS (SELECT 1 FROM {self.staging_table} s "
+            + "WHERE s.name = t.name) RETURNING t.name"
+        )
+
+    def delete(self) -> List[str]:
+        """Delete rows missing from staging and get their names."""
+
+        return execute_names(
+            f"DELETE FROM {self.table} t WHERE NOT EXISTS "
+            + f"(SELECT 1 FROM {self.staging_table} s "
+            + "WHERE s.name = t.name) RETURNING t.name"
+        )
+
+    def merge(self, archivable: bool = True) -> Dict[str, int]:
+        """
+        Apply all staged changes in the order updated, unarchived, created,
+        then archived (or deleted), logging each change, and get counts of
+        each kind of change.
+        """
+
+        logger.info(f"Merging {self.model.__name__} Changes...")
+
+        with tracer.span("merge", model=self.model.__name__) as span:
+            changes = {"updated": self.update(archivable)}
+
+            if archivable:
+                changes["unarchived"] = self.unarchive()
+                changes["created"] = self.create(archivable)
+                changes["archived"] = self.archive()
+            else:
+                changes["created"] = self.create(archivable)
+                changes["deleted"] = self.delete()
+
+            span.set(**{key: len(names) for key, names in changes.items()})
+
+        for key, names in changes.items():
+            log_names(self.model, change_actions[key], names)
+
+            for name in names:
+                change_log.add(
+                    change_ops[key], self.table, name, self.records.get(name)
+                )
+
+        # count changes in the same order as the update stages do
+        counter = {
+            key: len(changes[key])
+            for key in (
+                "created",
+                "archived",
+                "unarchived",
+                "deleted",
+                "updated",
+            )
+            if key in changes
+        }
+
+        logger.info(
+            "SUMMARY\n"
+            + "".join(f"  {key}: {count}\n" for key, count in counter.items())
+        )
+
+        return counter
+
+
+# MAIN FUNCTION
+
+
+def staging_refresh(
+    marshall_resources: Iterable[ResourceRecord],
+) -> Dict[str, Dict[str, int]]:
+    """
+    Update summarizer data to reflect the complete extracted marshall state
+    in one transaction. All records are loaded with `COPY` into temporary
+    staging tables, then merged into each table with a few set-based
+    statements, regardless of how many models there are. Return the change
+    counts of each table.
+    """
+
+    texts = {}
+    rows = {model: [] for model in record_classes}
+    records = {model: {} for model in record_classes}
+
+    def encode(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace texts in a row with hash columns, collecting the texts."""
+
+        encoded = {}
+        for key, value in row.items():
+            if key not in text_columns:
+                encoded[key] = value
+            elif value is None:
+                encoded[text_columns[key]] = None
+            else:
+                text_hash = hash_text(value)
+                texts[text_hash] = value
+                encoded[text_columns[key]] = text_hash
+
+        return encoded
+
+    def stage(model: Any, record: Record) -> None:
+        """Collect the encoded row of a record, indexing it by name."""
+
+        rows[model].append(encode(record.row()))
+        records[model][record.name] = record
+
+    for resource in marshall_resources:
+        stage(Resource, resource)
+
+        for field in resource.fields:
+            stage(Field, field)
+            for metadata in field.metadata:
+                stage(Metadata, metadata)
+
+        for relationship in resource.relationships:
+            stage(Relationship, relationship)
+
+    logger.info("Staging Marshall Data...")
+
+    # store all new texts before the rows referencing them
+    text_table = create_staging_table(Text, ["hash", "content"])
+    copy_rows(text_table, ["hash", "content"], texts.items())
+    db.session.execute(
+        text(
+            "INSERT INTO text (hash, content) SELECT hash, content "
+            + f"FROM {text_table} ON CONFLICT (hash) DO NOTHING"
+        )
+    )
+
+    # stage all tables before merging, parents first so foreign keys hold
+    staged = {
+        model: StagingTable(model, record_class, rows[model], records[model])
+        for model, record_class in record_classes.items()
+    }
+
+    counts = {
+        "resources": staged[Resource].merge(),
+        "fields": staged[Field].merge(),
+        "metadata": staged[Metadata].merge(False),
+        "relationships": staged[Relationship].merge(False),
+    }
+
+    # log all changes in the same transaction
+    change_log.flush()
+
+    with tracer.span("commit", stage="staging"):
+        db.session.commit()
+
+    logger.info("...Staged Changes Committed\n")
+
+    for entity, counter in counts.items():
+        refresh_report.record(entity, counter)
+
+    return counts
@@ -0,0 +1,164 @@
+from app.database import db
+from app.summarize.lib.diff_databases.lib.snapshot_history import (
+    get_snapshot_state,
+)
+from app.summarize.models import ChangeRecord, CommitSnapshot
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from typing import Any, Hashable, Optional, Tuple
+import json
+import sys
+import threading
+import zlib
+
+# default memory budget of cached states, in bytes
+default_budget = 256 * 1024 * 1024
+
+
+# STATE CACHE CLASS
+
+
+class StateCache:
+    """
+    In-process LRU cache of reconstructed snapshot states, bounded by a
+    memory budget (the `STATE_CACHE_BYTES` setting by default).
+
+    States are cached as compressed JSON and decoded on each hit, as
+    decoded states take several times the size of their encoding, so the
+    budget bounds the memory actually held. Least recently used states are
+    evicted until all cached states fit the budget, and states larger than
+    the whole budget are never cached. Each hit decodes a fresh copy, so
+    callers may change it.
+    """
+
+    def __init__(self, budget: Optional[int] = None) -> None:
+        self.__budget = budget
+        self.__states = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def budget(self) -> int:
+        """Get the memory budget in bytes."""
+
+        if self.__budget is not None:
+            return self.__budget
+
+        return current_app.config.get("STATE_CACHE_BYTES", default_budget)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached state, marking it as recently used."""
+
+        with self.__lock:
+            if key not in self.__states:
+                return None
+
+            self.__states.move_to_end(key)
+            encoded = self.__states[key][0]
+
+        return json.loads(zlib.decompress(encoded))
+
+    def put(self, key: Hashable, state: Any) -> None:
+        """Cache a state, evicting least recently used states to fit it."""
+
+        encoded = zlib.compress(
+            json.dumps(state, default=str, separators=(",", ":")).encode()
+        )
+        size = sys.getsizeof(encoded)
+        budget = self.budget
+
+        if size > budget:
+            return
+
+        with self.__lock:
+            if key in self.__states:
+                self.__size -= self.__states.pop(key)[1]
+
+            while self.__states and self.__size + size > budget:
+                _, (_, evicted_size) = self.__states.popitem(last=False)
+                self.__size -= evicted_size
+
+            self.__states[key] = (encoded, size)
+            self.__size += size
+
+    def clear(self) -> None:
+        """Remove all cached states."""
+
+        with self.__lock:
+            self.__states.clear()
+            self.__size = 0
+
+
+# HELPER FUNCTIONS
+
+
+def get_snapshot_key(
+    commit_id: str,
+) -> Optional[Tuple[int, datetime, Optional[int]]]:
+    """
+    Get the cache key of a marshall commit's snapshot (its id, modification
+    date and latest change record id), or `None` if the commit has no
+    snapshot.
+    """
+
+    latest_record_id = (
+        select(func.max(ChangeRecord.id))
+        .where(ChangeRecord.snapshot_id == CommitSnapshot.id)
+        .scalar_subquery()
+    )
+    snapshot_key = (
+        db.session.query(
+            CommitSnapshot.id, CommitSnapshot.date_modified, latest_record_id
+        )
+        .filter(CommitSnapshot.commit_id == commit_id)
+        .first()
+    )
+
+    return tuple(snapshot_key) if snapshot_key is not None else None
+
+
+def get_cached_state(
+    key: Tuple[int, datetime, Optional[int]],
+    base: Optional[Tuple[int, Any]] = None,
+) -> Any:
+    """
+    Get the state as of the snapshot with a cache key from the state cache,
+    reconstructing (from `base`, if it is closer than any checkpoint) and
+    caching it if missing.
+    """
+
+    state = state_cache.get(key)
+
+    if state is None:
+        state = get_snapshot_state(CommitSnapshot.query.get(key[0]), base)
+        state_cache.put(key, state)
+
+    return state
+
+
+# MAIN FUNCTION
+
+
+def get_cached_commit_state(commit_id: str) -> Optional[Any]:
+    """
+    Get the state of summarizer resources as of a marshall commit from the
+    state cache, reconstructing and caching it if missing, or `None` if the
+    commit has no snapshot.
+
+    States are cached by snapshot id, modification date and latest change
+    record, so changes appended to a snapshot by a forced refresh are never
+    served stale.
+    """
+
+    key = get_snapshot_key(commit_id)
+
+    if key is None:
+        return None
+
+    return get_cached_state(key)
+
+
+# cache shared by all requests
+state_cache = StateCache()
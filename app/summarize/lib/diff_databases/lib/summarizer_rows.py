@@ -0,0 +1,65 @@
+from app.database import db
+from app.summarize.lib.diff_databases.lib.helpers import names_in
+from sqlalchemy.sql import ClauseElement
+from typing import Any, Dict, Iterator, List
+
+# number of rows fetched per round trip when streaming summary rows
+stream_batch_size = 1000
+
+
+# HELPER FUNCTIONS
+
+
+def get_summary_columns(model: Any) -> List:
+    """
+    Get the columns of a model needed to match and change-check its rows:
+    name, archive flag (if the model is archivable) and content hash.
+    """
+
+    columns = [model.name, model.content_hash]
+
+    if hasattr(model, "is_archived"):
+        columns.append(model.is_archived)
+
+    return columns
+
+
+# MAIN FUNCTIONS
+
+
+def get_summary_rows(model: Any, *criteria: ClauseElement) -> Iterator:
+    """
+    Stream summary rows of a model matching `criteria`, sorted by name, from
+    a server-side cursor.
+    """
+
+    return (
+        db.session.query(*get_summary_columns(model))
+        .filter(*criteria)
+        # sort by code point, as python does, for merge-joins against
+        # sorted marshall records
+        .order_by(model.name.collate("C"))
+        .execution_options(stream_results=True)
+        .yield_per(stream_batch_size)
+    )
+
+
+def load_changed_rows(model: Any, delta: Dict) -> None:
+    """
+    Replace summary rows of persisted models whose content hashes differ
+    from their marshall records (the previous models of a delta) with full
+    rows, fetched in one query.
+    """
+
+    previous = delta["previous"]
+    names = list(previous)
+
+    if not names:
+        return
+
+    for row in model.query.filter(names_in(model.name, names)).all():
+        previous[row.name] = row
+
+        # detach rows, so commits by earlier update stages don't expire them
+        # and comparing against them never queries the database again
+        db.session.expunge(row)
@@ -1,11 +1,20 @@
 from app.database import db
 from app.lib.logger import logger
-from app.summarize.lib.extractors.summarizer import SummarizerResource
-from app.summarize.models import CommitSnapshot, Resource
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.snapshot_history import (
+    discard_checkpoints,
+    get_current_state,
+    get_snapshot_state,
+    is_compressed_storage,
+)
+from app.summarize.lib.diff_databases.lib.snapshot_layout import (
+    current_layout,
+)
+from app.summarize.models import ChangeRecord, CommitSnapshot
 from jsonpatch import JsonPatch
+from typing import Optional
 import subprocess
 
-
 # HELPER FUNCTIONS
 
 
@@ -18,52 +27,149 @@ def get_marshall_commit_id() -> str:
     return output.decode("ascii").strip()
 
 
-def take_commit_snapshot() -> None:
+def has_commit_snapshot(commit_id: str) -> bool:
+    """Check if a marshall commit already has a snapshot."""
+
+    commit_exists_query = CommitSnapshot.query.filter(
+        CommitSnapshot.commit_id == commit_id
+    )
+
+    return db.session.query(commit_exists_query.exists()).scalar()
+
+
+def has_change_records(snapshot: Optional[CommitSnapshot]) -> bool:
     """
-    Get and save json diff for current commit compared to previous as a
-    `CommitSnapshot`.
+    Check if a snapshot holds change records and no unlogged refresh ran
+    since, so replaying it reaches the current state, without loading its
+    records or payload.
     """
 
-    logger.info("Taking Commit Snapshot of Summarizer Resources...")
-
-    current_commit_id = get_marshall_commit_id()
+    if snapshot is None:
+        return False
 
-    # check if commit already has snapshot, and abort if so
-    commit_exists_query = CommitSnapshot.query.filter(
-        CommitSnapshot.commit_id == current_commit_id
+    return (
+        db.session.query(
+            CommitSnapshot.changes.isnot(None)
+            & CommitSnapshot.is_stale.is_(False)
+        )
+        .filter(CommitSnapshot.id == snapshot.id)
+        .scalar()
     )
-    if db.session.query(commit_exists_query.exists()):
-        logger.warn(f"  commit {current_commit_id} already has snapshot")
-        logger.info("...Commit Snapshot Aborted")
-        return
 
-    logger.info(f"  commit: {current_commit_id}")
 
-    # get current resource data
-    resources = [
-        SummarizerResource(resource).__dict__
-        for resource in Resource.query.all()
-    ]
+def get_catch_up_diff(snapshot: Optional[CommitSnapshot]) -> list:
+    """
+    Get json diff from the name-keyed state as of a snapshot to the current
+    state of summarizer resources. Its cost is proportional to the catalog,
+    so it is only taken to bridge from snapshots without change records.
+    """
+
+    # get current resource data, keyed by name so the diff stays
+    # proportional to the resources that changed
+    resources = get_current_state()
 
     # calculate previous resources state based on commit snapshots
-    previous_diffs = [
-        diff
-        for snapshot in CommitSnapshot.query.all()
-        for diff in snapshot.diff
-    ]
-    previous_resources = JsonPatch(previous_diffs).apply({})
+    previous_resources = get_snapshot_state(snapshot) if snapshot else {}
 
     # calculate diff to get from `previous_resources` to `resources`
-    next_diff = JsonPatch.from_diff(previous_resources, resources)
+    return JsonPatch.from_diff(previous_resources, resources).patch
 
-    # create new `CommitSnapshot`
-    commit_snapshot = CommitSnapshot(
-        commit_id=current_commit_id, diff=next_diff.patch
-    )
 
-    db.session.add(commit_snapshot)
-    db.session.commit()
+# MAIN FUNCTION
+
+
+def take_commit_snapshot() -> bool:
+    """
+    Create the `CommitSnapshot` of the current commit, which the refresh
+    fills with change records as it writes (see `ChangeLog`). Return whether
+    changes can be logged to the snapshot.
+
+    Snapshots taken before change records existed hold full-state diffs.
+    The first snapshot after them (or the first snapshot at all) starts with
+    a diff catching up to the current state, so replaying all snapshots
+    stays exact. A forced refresh of a summarized commit appends its changes
+    to the existing snapshot, if it is the latest one.
+
+    Changes of a refresh of a commit with an earlier snapshot can't be
+    logged, so the latest snapshot is marked stale, and the next snapshot
+    starts with a catch-up diff again. Diffs are stored as `JSONB`, or
+    compressed if the `SNAPSHOT_STORAGE` setting is `compressed`.
+    """
+
+    logger.info("Taking Commit Snapshot of Summarizer Resources...")
+
+    current_commit_id = get_marshall_commit_id()
+    logger.info(f"  commit: {current_commit_id}")
+
+    latest_snapshot = CommitSnapshot.query.order_by(
+        CommitSnapshot.id.desc()
+    ).first()
+
+    if has_commit_snapshot(current_commit_id):
+        # changes can only be appended to the end of the snapshot chain, so
+        # the chain no longer reaches the database state after this refresh
+        if latest_snapshot.commit_id != current_commit_id:
+            logger.warn(
+                f"  commit {current_commit_id} has an earlier snapshot, so "
+                + "changes are not logged, and the next snapshot catches up"
+            )
+            latest_snapshot.is_stale = True
+            with tracer.span("commit", stage="snapshot", operations=0):
+                db.session.commit()
+            logger.info("...Commit Snapshot Aborted")
+            return False
+
+        # checkpoints of the snapshot would miss the appended changes
+        discard_checkpoints(latest_snapshot.id)
+
+        if has_change_records(latest_snapshot):
+            with tracer.span("commit", stage="snapshot", operations=0):
+                db.session.commit()
+            logger.info("...Changes Appended to Existing Commit Snapshot")
+            return True
+
+        # bridge an existing full-state or stale snapshot to change records,
+        # by diffing from the snapshot before it in the name-keyed layout.
+        # The diff reaches the current state, so replaces earlier records
+        previous_snapshot = (
+            CommitSnapshot.query.filter(
+                CommitSnapshot.id < latest_snapshot.id
+            )
+            .order_by(CommitSnapshot.id.desc())
+            .first()
+        )
+        latest_snapshot.store_diff(
+            get_catch_up_diff(previous_snapshot), is_compressed_storage()
+        )
+        ChangeRecord.query.filter_by(snapshot_id=latest_snapshot.id).delete(
+            synchronize_session=False
+        )
+        latest_snapshot.changes = []
+        latest_snapshot.is_stale = False
+        latest_snapshot.layout = current_layout
+        commit_snapshot = latest_snapshot
+    else:
+        commit_snapshot = CommitSnapshot(
+            commit_id=current_commit_id, changes=[], layout=current_layout
+        )
+        commit_snapshot.store_diff(
+            (
+                []
+                if has_change_records(latest_snapshot)
+                else get_catch_up_diff(latest_snapshot)
+            ),
+            is_compressed_storage(),
+        )
+        db.session.add(commit_snapshot)
+
+    with tracer.span(
+        "commit",
+        stage="snapshot",
+        operations=commit_snapshot.op_count,
+        bytes=commit_snapshot.byte_size,
+    ):
+        db.session.commit()
 
     logger.info(f"...Commit Snapshot Created")
 
-    return
+    return True
@@ -0,0 +1,158 @@
+from app.database import db
+from app.lib.tracing import tracer
+from app.summarize.lib.diff_databases.lib.helpers import chunked
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
+)
+from app.summarize.lib.extractors.records import Record
+from app.summarize.models import Field, Metadata, Relationship, Resource, Text
+from hashlib import sha256
+from sqlalchemy import select, union
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Dict, Iterable, Optional
+
+# row keys stored in the text dictionary, and the hash columns they are
+# stored as
+text_columns = {
+    "description": "description_hash",
+    "value": "value_hash",
+}
+
+# number of new texts inserted per statement
+text_batch_size = 1000
+
+
+# HELPER FUNCTIONS
+
+
+def hash_text(content: str) -> str:
+    """Get the content address of a text."""
+
+    return sha256(content.encode("utf-8")).hexdigest()
+
+
+# TEXT DICTIONARY CLASS
+
+
+class TextDictionary:
+    """
+    Content-addressed store of descriptions and metadata values.
+
+    Each distinct text is stored once in the `text` table and referenced by
+    hash, so repeated field class docstrings and common metadata values like
+    `True` or `None` are not written per row. Call `load` at the start of a
+    refresh so only texts new to the database are inserted. New texts are
+    collected as rows are encoded, and `flush` inserts them in batches
+    before the rows referencing them are written.
+    """
+
+    def __init__(self) -> None:
+        self.__known_hashes = set()
+        self.__new_texts: Dict[str, str] = {}
+
+    def load(self) -> None:
+        """Load hashes of all texts already stored in the database."""
+
+        self.__known_hashes = {
+            text_hash for (text_hash,) in db.session.query(Text.hash)
+        }
+        self.__new_texts = {}
+
+    def add(self, content: Optional[str]) -> Optional[str]:
+        """Collect a text if it is new and get its hash."""
+
+        if content is None:
+            return None
+
+        text_hash = hash_text(content)
+
+        # texts are only hashed in a dry run
+        if (
+            text_hash not in self.__known_hashes
+            and not refresh_report.dry_run
+        ):
+            self.__new_texts[text_hash] = content
+            self.__known_hashes.add(text_hash)
+
+        return text_hash
+
+    def flush(self) -> None:
+        """
+        Store all texts collected since the last flush in the session's
+        transaction, with one statement per batch of texts.
+        """
+
+        new_texts, self.__new_texts = self.__new_texts, {}
+
+        for batch in chunked(new_texts.items(), text_batch_size):
+            db.session.execute(
+                insert(Text)
+                .values(
+                    [
+                        {"hash": text_hash, "content": content}
+                        for text_hash, content in batch
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=["hash"])
+            )
+
+    def preload(self, records: Iterable[Record]) -> None:
+        """
+        Store all new texts of records up front and commit them, so update
+        stages running concurrently only reference stored texts and never
+        insert the same text on two connections at once.
+        """
+
+        for record in records:
+            for key, value in record.row().items():
+                if key in text_columns:
+                    self.add(value)
+
+        self.flush()
+
+        with tracer.span("commit", stage="texts"):
+            db.session.commit()
+
+    def encode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get a copy of a record row with texts replaced by hash columns,
+        collecting any new texts.
+        """
+
+        return {
+            text_columns.get(key, key): (
+                self.add(value) if key in text_columns else value
+            )
+            for key, value in row.items()
+        }
+
+    def prune(self) -> int:
+        """Delete texts no longer referenced by any row."""
+
+        referenced = union(
+            select(Resource.description_hash),
+            select(Field.description_hash),
+            select(Relationship.description_hash),
+            select(Metadata.description_hash),
+            select(Metadata.value_hash),
+        ).subquery()
+
+        deleted = (
+            db.session.query(Text)
+            .filter(
+                Text.hash.notin_(
+                    select(referenced.c[0]).where(referenced.c[0].isnot(None))
+                )
+            )
+            .delete(synchronize_session=False)
+        )
+        with tracer.span("commit", stage="prune", rows=deleted):
+            db.session.commit()
+
+        self.load()
+
+        return deleted
+
+
+# dictionary shared by all update stages, reloaded once per refresh
+text_dictionary = TextDictionary()
@@ -1,93 +1,116 @@
 from app.database import db
 from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.summarize.models import Field
-from app.summarize.lib.extractors import (
-    AbstractField,
-    AbstractMetadata,
-    SummarizerField,
+from app.summarize.lib.extractors import FieldRecord, MetadataRecord
+from app.summarize.lib.diff_databases.lib.bulk_writer import BulkWriter
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.helpers import extract_columns
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
 )
-from app.summarize.lib.diff_databases.lib.helpers import (
-    extract_top_level_data,
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    text_dictionary,
 )
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 
 
-def update_fields(field_delta: Dict) -> List[AbstractMetadata]:
+def update_fields(
+    field_delta: Dict, skip_unchanged: bool = True
+) -> Tuple[List[MetadataRecord], Set[str]]:
+    """
+    Compare marshall fields to summarizer fields and update summarizer data
+    accordingly. Return all metadata in marshall instance belonging to
+    changed fields, along with the names of fields whose content hash is
+    unchanged, whose metadata was skipped. If `skip_unchanged` is not set,
+    metadata of unchanged fields is returned too.
+    """
 
     # collect all child metadata from fields
     marshall_metadata = []
 
+    # collect names of fields whose metadata are unchanged
+    unchanged_names = set()
+
     # track change counts
     counter = {"created": 0, "unarchived": 0, "archived": 0, "updated": 0}
 
+    # plan writes to apply in bulk once all changes are staged
+    writer = BulkWriter(Field)
+
     # HELPER METHODS
 
-    def is_field_modified(next_data: AbstractField) -> bool:
+    def is_field_unchanged(next_data: FieldRecord) -> bool:
+        """
+        Check if field and all its metadata are unchanged, by content hash.
+        """
+
+        # only previous models with differing content hashes are kept
+        return next_data.name not in field_delta["previous"]
+
+    def is_field_modified(next_data: FieldRecord) -> bool:
         """Check if field has been changed."""
 
-        prev_data = Field.query.filter_by(name=next_data.name).first()
+        prev_data = field_delta["previous"][next_data.name]
+
+        next_flat = text_dictionary.encode(next_data.row())
+        prev_flat = extract_columns(prev_data, next_flat)
 
-        prev_flat, next_flat = (
-            extract_top_level_data(SummarizerField(prev_data)),
-            extract_top_level_data(next_data),
-        )
+        # content hashes also cover children, so are compared separately
+        del prev_flat["content_hash"]
+        del next_flat["content_hash"]
 
         return prev_flat != next_flat
 
-    def extract_meta(
-        next_data: AbstractField,
-    ) -> List[Tuple[AbstractMetadata, str]]:
+    def extract_meta(next_data: FieldRecord) -> None:
         """Collect child metadata per resource."""
 
         marshall_metadata.extend(next_data.metadata)
 
     # CRUD METHODS
 
-    def create_field(next_data: AbstractField) -> None:
+    def create_field(next_data: FieldRecord) -> None:
         """Create field in database."""
 
-        flat_data = extract_top_level_data(next_data)
-        field = Field(**flat_data)
-        db.session.add(field)
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["created"] += 1
+        change_log.add("create", "field", next_data.name, next_data)
 
         logger.info(f"  Field[CREATE] {next_data.name}")
 
     def archive_field(prev_data: Field) -> None:
         """Archive field in database."""
 
-        db.session.query(Field).filter_by(name=prev_data.name).update(
-            dict(is_archived=True)
-        )
+        writer.archive(prev_data.name)
         counter["archived"] += 1
+        change_log.add("archive", "field", prev_data.name)
 
         logger.info(f"  Field[ARCHIVE] {prev_data.name}")
 
-    def unarchive_field(next_data: AbstractField) -> None:
+    def unarchive_field(next_data: FieldRecord) -> None:
         """Unarchive field in database."""
 
-        flat_data = extract_top_level_data(next_data)
-        flat_data["is_archived"] = False
-
-        db.session.query(Field).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
+        writer.unarchive(next_data.name)
         counter["unarchived"] += 1
+        change_log.add("unarchive", "field", next_data.name, next_data)
 
         logger.info(f"  Field[UNARCHIVE] {next_data.name}")
 
-    def update_field(next_data: AbstractField) -> None:
+    def update_field(next_data: FieldRecord) -> None:
         """Update field in database."""
 
-        flat_data = extract_top_level_data(next_data)
-
-        db.session.query(Field).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["updated"] += 1
+        change_log.add("update", "field", next_data.name, next_data)
 
         logger.info(f"  Field[UPDATE] {next_data.name}")
 
+    def rehash_field(next_data: FieldRecord) -> None:
+        """Store the content hash of an otherwise unmodified field."""
+
+        writer.upsert(text_dictionary.encode(next_data.row()))
+
     logger.info("Staging Field Changes...")
 
     # iterate through each category of fields and stage appropriate changes
@@ -104,13 +127,25 @@ def update_fields(field_delta: Dict) -> List[AbstractMetadata]:
         archive_field(prev_data)
 
     for next_data in field_delta["persisted"]:
+        # skip fields whose metadata is also unchanged
+        if is_field_unchanged(next_data):
+            if skip_unchanged:
+                unchanged_names.add(next_data.name)
+            else:
+                extract_meta(next_data)
+            continue
+
         is_modified = is_field_modified(next_data)
         if is_modified:
             update_field(next_data)
+        else:
+            rehash_field(next_data)
         extract_meta(next_data)
 
-    # commit all database changes
-    db.session.commit()
+    # apply and commit all database changes
+    writer.apply()
+    with tracer.span("commit", stage="fields"):
+        db.session.commit()
 
     logger.info("...Fields Committed\n")
 
@@ -122,4 +157,6 @@ def update_fields(field_delta: Dict) -> List[AbstractMetadata]:
         + f"  updated: {counter['updated']}\n"
     )
 
-    return marshall_metadata
+    refresh_report.record("fields", counter)
+
+    return (marshall_metadata, unchanged_names)
@@ -2,13 +2,17 @@ from typing import Dict
 
 from app.database import db
 from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.summarize.models import Metadata
-from app.summarize.lib.extractors import (
-    AbstractMetadata,
-    SummarizerMetadata,
+from app.summarize.lib.extractors import MetadataRecord
+from app.summarize.lib.diff_databases.lib.bulk_writer import BulkWriter
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.helpers import extract_columns
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
 )
-from app.summarize.lib.diff_databases.lib.helpers import (
-    extract_top_level_data,
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    text_dictionary,
 )
 
 
@@ -21,52 +25,65 @@ def update_metadata(metadata_delta: Dict) -> None:
     # track change counts
     counter = {"created": 0, "deleted": 0, "updated": 0}
 
+    # plan writes to apply in bulk once all changes are staged
+    writer = BulkWriter(Metadata)
+
     # HELPER METHODS
 
-    def is_metadata_modified(next_data: AbstractMetadata) -> bool:
+    def is_metadata_unchanged(next_data: MetadataRecord) -> bool:
+        """Check if metadata is unchanged, by content hash."""
+
+        # only previous models with differing content hashes are kept
+        return next_data.name not in metadata_delta["previous"]
+
+    def is_metadata_modified(next_data: MetadataRecord) -> bool:
         """Check if metadata has been changed."""
 
-        prev_data = Metadata.query.filter_by(name=next_data.name).first()
+        prev_data = metadata_delta["previous"][next_data.name]
 
-        prev_flat, next_flat = (
-            extract_top_level_data(SummarizerMetadata(prev_data)),
-            extract_top_level_data(next_data),
-        )
+        next_flat = text_dictionary.encode(next_data.row())
+        prev_flat = extract_columns(prev_data, next_flat)
+
+        # content hashes also cover children, so are compared separately
+        del prev_flat["content_hash"]
+        del next_flat["content_hash"]
 
         return prev_flat != next_flat
 
     # CRUD METHODS
 
-    def create_metadata(next_data: AbstractMetadata) -> None:
+    def create_metadata(next_data: MetadataRecord) -> None:
         """Create metadata in database."""
 
-        flat_data = extract_top_level_data(next_data)
-        metadata = Metadata(**flat_data)
-        db.session.add(metadata)
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["created"] += 1
+        change_log.add("create", "metadata", next_data.name, next_data)
 
         logger.info(f"  Metadata[CREATE] {next_data.name}")
 
     def delete_metadata(prev_data: Metadata) -> None:
         """Delete metadata from database."""
 
-        db.session.query(Metadata).filter_by(name=prev_data.name).delete()
+        writer.delete(prev_data.name)
         counter["deleted"] += 1
+        change_log.add("delete", "metadata", prev_data.name)
 
         logger.info(f"  Metadata[DELETE] {prev_data.name}")
 
-    def update_metadata(next_data: AbstractMetadata) -> None:
+    def update_metadata(next_data: MetadataRecord) -> None:
         """Update metadata in database."""
 
-        flat_data = extract_top_level_data(next_data)
-
-        db.session.query(Metadata).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["updated"] += 1
+        change_log.add("update", "metadata", next_data.name, next_data)
 
         logger.info(f"  Metadata[UPDATE] {next_data.name}")
 
+    def rehash_metadata(next_data: MetadataRecord) -> None:
+        """Store the content hash of an otherwise unmodified metadata."""
+
+        writer.upsert(text_dictionary.encode(next_data.row()))
+
     logger.info("Staging Metadata Changes...")
 
     # iterate through each category of metadata and stage appropriate changes
@@ -78,12 +95,19 @@ def update_metadata(metadata_delta: Dict) -> None:
         delete_metadata(prev_data)
 
     for next_data in metadata_delta["persisted"]:
+        if is_metadata_unchanged(next_data):
+            continue
+
         is_modified = is_metadata_modified(next_data)
         if is_modified:
             update_metadata(next_data)
+        else:
+            rehash_metadata(next_data)
 
-    # commit all database changes
-    db.session.commit()
+    # apply and commit all database changes
+    writer.apply()
+    with tracer.span("commit", stage="metadata"):
+        db.session.commit()
 
     logger.info("...Metadata Committed\n")
 
@@ -93,3 +117,5 @@ def update_metadata(metadata_delta: Dict) -> None:
         + f"  deleted: {counter['deleted']}\n"
         + f"  updated: {counter['updated']}\n"
     )
+
+    refresh_report.record("metadata", counter)
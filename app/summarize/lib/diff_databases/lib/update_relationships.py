@@ -2,13 +2,17 @@ from typing import Dict
 
 from app.database import db
 from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.summarize.models import Relationship
-from app.summarize.lib.extractors import (
-    AbstractRelationship,
-    SummarizerRelationship,
+from app.summarize.lib.extractors import RelationshipRecord
+from app.summarize.lib.diff_databases.lib.bulk_writer import BulkWriter
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.helpers import extract_columns
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
 )
-from app.summarize.lib.diff_databases.lib.helpers import (
-    extract_top_level_data,
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    text_dictionary,
 )
 
 
@@ -21,17 +25,28 @@ def update_relationships(relationship_delta: Dict):
     # track change counts
     counter = {"created": 0, "deleted": 0, "updated": 0}
 
+    # plan writes to apply in bulk once all changes are staged
+    writer = BulkWriter(Relationship)
+
     # HELPER METHODS
 
-    def is_relationship_modified(next_data: AbstractRelationship) -> bool:
+    def is_relationship_unchanged(next_data: RelationshipRecord) -> bool:
+        """Check if relationship is unchanged, by content hash."""
+
+        # only previous models with differing content hashes are kept
+        return next_data.name not in relationship_delta["previous"]
+
+    def is_relationship_modified(next_data: RelationshipRecord) -> bool:
         """Check if relationship has been changed."""
 
-        prev_data = Relationship.query.filter_by(name=next_data.name).first()
+        prev_data = relationship_delta["previous"][next_data.name]
 
-        prev_flat, next_flat = (
-            extract_top_level_data(SummarizerRelationship(prev_data)),
-            extract_top_level_data(next_data),
-        )
+        next_flat = text_dictionary.encode(next_data.row())
+        prev_flat = extract_columns(prev_data, next_flat)
+
+        # content hashes also cover children, so are compared separately
+        del prev_flat["content_hash"]
+        del next_flat["content_hash"]
 
         if prev_flat != next_flat:
             logger.info(prev_flat, next_flat)
@@ -40,36 +55,38 @@ def update_relationships(relationship_delta: Dict):
 
     # CRUD METHODS
 
-    def create_relationship(next_data: AbstractRelationship) -> None:
+    def create_relationship(next_data: RelationshipRecord) -> None:
         """Create relationship in database."""
 
-        flat_data = extract_top_level_data(next_data)
-        relationship = Relationship(**flat_data)
-        db.session.add(relationship)
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["created"] += 1
+        change_log.add("create", "relationship", next_data.name, next_data)
 
         logger.info(f"  Relationship[CREATE] {next_data.name}")
 
     def delete_relationship(prev_data: Relationship) -> None:
         """Delete relationship in database."""
 
-        db.session.query(Relationship).filter_by(name=prev_data.name).delete()
+        writer.delete(prev_data.name)
         counter["deleted"] += 1
+        change_log.add("delete", "relationship", prev_data.name)
 
         logger.info(f"  Relationship[DELETE] {prev_data.name}")
 
-    def update_relationship(next_data: AbstractRelationship) -> None:
+    def update_relationship(next_data: RelationshipRecord) -> None:
         """Update relationship in database."""
 
-        flat_data = extract_top_level_data(next_data)
-
-        db.session.query(Relationship).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["updated"] += 1
+        change_log.add("update", "relationship", next_data.name, next_data)
 
         logger.info(f"  Relationship[UPDATE] {next_data.name}")
 
+    def rehash_relationship(next_data: RelationshipRecord) -> None:
+        """Store the content hash of an otherwise unmodified relationship."""
+
+        writer.upsert(text_dictionary.encode(next_data.row()))
+
     logger.info("Staging Relationship Changes...")
 
     # iterate through each category of relationships and stage appropriate
@@ -81,12 +98,19 @@ def update_relationships(relationship_delta: Dict):
         delete_relationship(prev_data)
 
     for next_data in relationship_delta["persisted"]:
+        if is_relationship_unchanged(next_data):
+            continue
+
         is_modified = is_relationship_modified(next_data)
         if is_modified:
             update_relationship(next_data)
+        else:
+            rehash_relationship(next_data)
 
-    # commit all database changes
-    db.session.commit()
+    # apply and commit all database changes
+    writer.apply()
+    with tracer.span("commit", stage="relationships"):
+        db.session.commit()
 
     logger.info("...Relationships Committed\n")
 
@@ -96,3 +120,5 @@ def update_relationships(relationship_delta: Dict):
         + f"  deleted: {counter['deleted']}\n"
         + f"  updated: {counter['updated']}\n"
     )
+
+    refresh_report.record("relationships", counter)
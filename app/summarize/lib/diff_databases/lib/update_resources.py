@@ -1,47 +1,73 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 
 from app.database import db
 from app.lib.logger import logger
+from app.lib.tracing import tracer
 from app.summarize.models import Resource
 from app.summarize.lib.extractors import (
-    AbstractField,
-    AbstractResource,
-    SummarizerResource,
+    FieldRecord,
+    RelationshipRecord,
+    ResourceRecord,
 )
-from app.summarize.lib.extractors.abstract_resource import (
-    AbstractRelationship,
+from app.summarize.lib.diff_databases.lib.bulk_writer import BulkWriter
+from app.summarize.lib.diff_databases.lib.change_log import change_log
+from app.summarize.lib.diff_databases.lib.helpers import extract_columns
+from app.summarize.lib.diff_databases.lib.refresh_report import (
+    refresh_report,
 )
-from app.summarize.lib.diff_databases.lib.helpers import (
-    extract_top_level_data,
+from app.summarize.lib.diff_databases.lib.text_dictionary import (
+    text_dictionary,
 )
 
 
 def update_resources(
-    resource_delta: Dict,
-) -> Tuple[List[AbstractField], List[AbstractRelationship]]:
+    resource_delta: Dict, skip_unchanged: bool = True
+) -> Tuple[List[FieldRecord], List[RelationshipRecord], Set[str]]:
     """
     Compare marshall resources to summarizer resources and update summarizer
-    data accordingly. Return all fields and relationships in marshall instance.
+    data accordingly. Return all fields and relationships in marshall instance
+    belonging to changed resources, along with the names of resources whose
+    content hash is unchanged, whose fields and relationships were skipped.
+    If `skip_unchanged` is not set, children of unchanged resources are
+    returned too, e.g. when resuming an interrupted refresh that may have
+    stored a resource's content hash before its children.
     """
 
     # collect all child fields and relationships from resources
     marshall_fields = []
     marshall_relationships = []
 
+    # collect names of resources whose subtrees are unchanged
+    unchanged_names = set()
+
     # track change counts
     counter = {"created": 0, "unarchived": 0, "archived": 0, "updated": 0}
 
+    # plan writes to apply in bulk once all changes are staged
+    writer = BulkWriter(Resource)
+
     # HELPER METHODS
 
-    def is_resource_modified(next_data: AbstractResource) -> bool:
+    def is_resource_unchanged(next_data: ResourceRecord) -> bool:
+        """
+        Check if resource and all its children are unchanged, by content
+        hash.
+        """
+
+        # only previous models with differing content hashes are kept
+        return next_data.name not in resource_delta["previous"]
+
+    def is_resource_modified(next_data: ResourceRecord) -> bool:
         """Check if resource has been changed."""
 
-        prev_data = Resource.query.filter_by(name=next_data.name).first()
+        prev_data = resource_delta["previous"][next_data.name]
+
+        next_flat = text_dictionary.encode(next_data.row())
+        prev_flat = extract_columns(prev_data, next_flat)
 
-        prev_flat, next_flat = (
-            extract_top_level_data(SummarizerResource(prev_data)),
-            extract_top_level_data(next_data),
-        )
+        # content hashes also cover children, so are compared separately
+        del prev_flat["content_hash"]
+        del next_flat["content_hash"]
 
         # do not compare database type as this will always vary between
         # marshall and summarizer resources
@@ -50,9 +76,7 @@ def update_resources(
 
         return prev_flat != next_flat
 
-    def extract_children(
-        next_data: AbstractResource,
-    ) -> List[Tuple[AbstractField, str]]:
+    def extract_children(next_data: ResourceRecord) -> None:
         """Collect child fields per resource."""
 
         marshall_fields.extend(next_data.fields)
@@ -60,52 +84,48 @@ def update_resources(
 
     # CRUD METHODS
 
-    def create_resource(next_data: AbstractResource) -> None:
+    def create_resource(next_data: ResourceRecord) -> None:
         """Create resource in database."""
 
-        flat_data = extract_top_level_data(next_data)
-
-        resource = Resource(**flat_data)
-        db.session.add(resource)
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["created"] += 1
+        change_log.add("create", "resource", next_data.name, next_data)
 
         logger.info(f"  Resource[CREATE] {next_data.name}")
 
     def archive_resource(prev_data: Resource) -> None:
         """Archive resource in database."""
 
-        db.session.query(Resource).filter_by(name=prev_data.name).update(
-            dict(is_archived=True)
-        )
+        writer.archive(prev_data.name)
         counter["archived"] += 1
+        change_log.add("archive", "resource", prev_data.name)
 
         logger.info(f"  Resource[ARCHIVE] {prev_data.name}")
 
-    def unarchive_resource(next_data: AbstractResource) -> None:
+    def unarchive_resource(next_data: ResourceRecord) -> None:
         """Unarchive resource in database."""
 
-        flat_data = extract_top_level_data(next_data)
-        flat_data["is_archived"] = False
-
-        db.session.query(Resource).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
+        writer.unarchive(next_data.name)
         counter["unarchived"] += 1
+        change_log.add("unarchive", "resource", next_data.name, next_data)
 
         logger.info(f"  Resource[UNARCHIVE] {next_data.name}")
 
-    def update_resource(next_data: AbstractResource) -> None:
+    def update_resource(next_data: ResourceRecord) -> None:
         """Update resource in database."""
 
-        flat_data = extract_top_level_data(next_data)
-
-        db.session.query(Resource).filter_by(name=next_data.name).update(
-            flat_data
-        )
+        writer.upsert(text_dictionary.encode(next_data.row()))
         counter["updated"] += 1
+        change_log.add("update", "resource", next_data.name, next_data)
 
         logger.info(f"  Resource[UPDATE] {next_data.name}")
 
+    def rehash_resource(next_data: ResourceRecord) -> None:
+        """Store the content hash of an otherwise unmodified resource."""
+
+        writer.upsert(text_dictionary.encode(next_data.row()))
+
     logger.info("Staging Resource Changes...")
 
     # iterate through each category of resources and stage appropriate changes
@@ -122,13 +142,25 @@ def update_resources(
         archive_resource(prev_data)
 
     for next_data in resource_delta["persisted"]:
+        # skip resources whose whole subtree is unchanged
+        if is_resource_unchanged(next_data):
+            if skip_unchanged:
+                unchanged_names.add(next_data.name)
+            else:
+                extract_children(next_data)
+            continue
+
         is_modified = is_resource_modified(next_data)
         if is_modified:
             update_resource(next_data)
+        else:
+            rehash_resource(next_data)
         extract_children(next_data)
 
-    # commit all database changes
-    db.session.commit()
+    # apply and commit all database changes
+    writer.apply()
+    with tracer.span("commit", stage="resources"):
+        db.session.commit()
 
     logger.info("...Resources Committed\n")
 
@@ -140,4 +172,6 @@ def update_resources(
         + f"  updated: {counter['updated']}\n"
     )
 
-    return (marshall_fields, marshall_relationships)
+    refresh_report.record("resources", counter)
+
+    return (marshall_fields, marshall_relationships, unchanged_names)
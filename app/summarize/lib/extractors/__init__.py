@@ -15,6 +15,12 @@ from .postgres import (
     PGRelationship,
     PGResource,
 )
+from .records import (
+    FieldRecord,
+    MetadataRecord,
+    RelationshipRecord,
+    ResourceRecord,
+)
 from .summarizer import (
     SummarizerField,
     SummarizerMetadata,
@@ -27,6 +33,8 @@ __all__ = [
     "AbstractMetadata",
     "AbstractRelationship",
     "AbstractResource",
+    "FieldRecord",
+    "MetadataRecord",
     "MongoField",
     "MongoMetadata",
     "MongoResource",
@@ -34,6 +42,8 @@ __all__ = [
     "PGMetadata",
     "PGRelationship",
     "PGResource",
+    "RelationshipRecord",
+    "ResourceRecord",
     "SummarizerField",
     "SummarizerMetadata",
     "SummarizerRelationship",
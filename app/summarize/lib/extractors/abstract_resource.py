@@ -1,11 +1,12 @@
 from abc import ABCMeta, abstractmethod
-from app.lib import DatabaseTypes
+from app.lib import DatabaseTypes, memoized_property
 from app.lib.logger import logger
-from inspect import getcomments, getsourcefile, getsourcelines
+from app.summarize.lib.extractors.source_index import source_index
 from os import getenv
-from os.path import relpath
+from os.path import normpath, relpath
 from re import sub
-from typing import List, Optional, Type, Union
+from typing import FrozenSet, List, Optional, Type, Union
+import sys
 
 
 # LOAD ENV VARIABLES
@@ -26,7 +27,7 @@ def get_description(obj: object) -> str:
         if type(obj).__module__ == "builtins"
         else obj.__doc__
     )
-    chunks = [doc, getcomments(obj)]
+    chunks = [doc, source_index.get_comments(obj)]
 
     return "\n".join(filter(None, chunks))
 
@@ -43,7 +44,7 @@ def dict_map(obj_list: List[object]) -> List[dict]:
 class AbstractMetadata(metaclass=ABCMeta):
     """Abstract metadata (singular) class for abstract `Field` class."""
 
-    @property
+    @memoized_property
     def description(self) -> str:
         """Get description string."""
 
@@ -91,7 +92,7 @@ class AbstractMetadata(metaclass=ABCMeta):
 class AbstractField(metaclass=ABCMeta):
     """Abstract field class for abstract `Resource` class."""
 
-    @property
+    @memoized_property
     def description(self) -> str:
         """Get description string."""
 
@@ -165,13 +166,13 @@ class AbstractField(metaclass=ABCMeta):
 class AbstractRelationship(metaclass=ABCMeta):
     """Abstract relationship class for abstract `Resource` class."""
 
-    @property
+    @memoized_property
     def description(self) -> str:
         """Get description string."""
 
         return get_description(self._value)
 
-    @property
+    @memoized_property
     def name(self) -> str:
         """Get unique name of relationship."""
         return f"{self.field_name}({self.type}){self.related_field_name}"
@@ -236,24 +237,27 @@ class AbstractRelationship(metaclass=ABCMeta):
 class AbstractResource(metaclass=ABCMeta):
     """Abstract `Resource` class."""
 
-    @property
+    @memoized_property
     def type(self) -> str:
         """Get resource type."""
 
         return self._value.__bases__[0].__name__
 
-    @property
+    @memoized_property
     def name(self) -> str:
         """Get resource name."""
 
         return "{}.{}".format(self._value.__module__, self._value.__name__)
 
-    @property
+    @memoized_property
     def source_link(self) -> Optional[str]:
         """Get a link to module in "marshall" Github repo with line number."""
 
         try:
-            relative_path = relpath(getsourcefile(self._value))
+            source_path, start_line = source_index.source_location(
+                self._value
+            )
+            relative_path = relpath(source_path)
             if not relative_path.startswith("marshall/"):
                 logger.info(
                     f'module "{self.name}" at "{relative_path}" '
@@ -262,7 +266,6 @@ class AbstractResource(metaclass=ABCMeta):
                 return None
 
             module_route = sub("^marshall/", "", relative_path)
-            start_line = getsourcelines(self._value)[1]
 
             return "{}/tree/{}/{}#L{}".format(
                 marshall_repo_base_url,
@@ -275,13 +278,27 @@ class AbstractResource(metaclass=ABCMeta):
                 "unable to get source link for {}".format(self._value)
             )
 
-    @property
+    @memoized_property
     def description(self) -> str:
         """Get description string."""
 
         return get_description(self._value)
 
-    @property
+    @memoized_property
+    def source_files(self) -> FrozenSet[str]:
+        """
+        Get relative paths of source files defining the resource class and
+        its base classes.
+        """
+
+        paths = (
+            getattr(sys.modules.get(cls.__module__), "__file__", None)
+            for cls in self._value.__mro__
+        )
+
+        return frozenset(normpath(relpath(path)) for path in paths if path)
+
+    @memoized_property
     def fields(self) -> List[AbstractField]:
         """Get list of all fields."""
 
@@ -0,0 +1,81 @@
+from typing import Dict, FrozenSet, List, Tuple, Type, get_type_hints
+
+
+class ClassPropertyIndex:
+    """
+    Index of properties defined on model classes, used to discover virtual
+    fields.
+
+    Each class's own `__dict__` is analysed once per refresh and the result
+    is reused for every subclass, so properties inherited from shared mixins
+    and base documents are not rediscovered per model. Return-type hints are
+    likewise resolved once per property. Call `clear` at the start of a
+    refresh so edited classes are picked up.
+    """
+
+    def __init__(self) -> None:
+        self.__own_attributes = {}
+        self.__return_types = {}
+
+    def clear(self) -> None:
+        """Drop all analysed classes and resolved type hints."""
+
+        self.__own_attributes = {}
+        self.__return_types = {}
+
+    def __get_own_attributes(
+        self, cls: Type
+    ) -> Tuple[Dict[str, property], FrozenSet[str]]:
+        """
+        Get properties defined directly on a class, along with the names of
+        all attributes it defines, which shadow those of its bases.
+        """
+
+        if cls not in self.__own_attributes:
+            attributes = vars(cls)
+            self.__own_attributes[cls] = (
+                {
+                    name: value
+                    for name, value in attributes.items()
+                    if isinstance(value, property)
+                },
+                frozenset(attributes),
+            )
+
+        return self.__own_attributes[cls]
+
+    def properties(self, cls: Type) -> List[Tuple[str, property]]:
+        """
+        Get all properties of a class, including inherited ones, sorted by
+        name. An attribute resolves to the first class in the MRO defining
+        it, as with `getattr`.
+        """
+
+        resolved = {}
+        seen = set()
+
+        for base in cls.__mro__:
+            own_properties, own_names = self.__get_own_attributes(base)
+
+            for name in own_names.difference(seen):
+                if name in own_properties:
+                    resolved[name] = own_properties[name]
+
+            seen.update(own_names)
+
+        return sorted(resolved.items())
+
+    def return_type(self, prop: property) -> str:
+        """Get the return-type hint of a property getter as a string."""
+
+        if prop not in self.__return_types:
+            hints = get_type_hints(prop.fget)
+            self.__return_types[prop] = (
+                str(hints["return"]) if "return" in hints else "undefined"
+            )
+
+        return self.__return_types[prop]
+
+
+# index shared by all extractors, reset once per refresh
+class_properties = ClassPropertyIndex()
@@ -1,5 +1,4 @@
-import re
-from app.lib.logger import logger
+from app.lib import memoized_property
 from app.lib.types import MongoModelType
 from app.summarize.lib import DefaultTransformer
 from app.summarize.lib.extractors import (
@@ -7,10 +6,11 @@ from app.summarize.lib.extractors import (
     AbstractMetadata,
     AbstractResource,
 )
+from app.summarize.lib.extractors.class_properties import class_properties
+from app.summarize.lib.extractors.value_renderer import value_renderer
 from mongoengine.base import BaseField
-from mongoengine.connection import ConnectionFailure
 from mongoengine.fields import LazyReferenceField, ReferenceField
-from typing import Any, List, Optional, Tuple, Type, Union, get_type_hints
+from typing import Any, List, Optional, Tuple, Type, Union
 
 # HELPER FUNCTIONS
 
@@ -91,16 +91,13 @@ class MongoFieldTypeTransformer:
 class MongoMetadata(AbstractMetadata):
     """Mongo field metadata (singular) concrete class."""
 
-    @property
+    @memoized_property
     def name(self):
         return f"{self._field_name}.{self._name}"
 
-    @property
+    @memoized_property
     def value(self):
-
-        # strip memory address if present
-        value = re.sub(r" \S+ at 0x[0-9A-Za-z]{9}", "", str(self._value))
-        return value
+        return value_renderer(self._value)
 
     @property
     def field_name(self):
@@ -121,11 +118,11 @@ class MongoField(AbstractField):
     (see metaclass for method docs)
     """
 
-    @property
+    @memoized_property
     def name(self) -> str:
         return f"{self._resource_name}.{self._value.name}"
 
-    @property
+    @memoized_property
     def type(self) -> str:
         return self.__transformer(self._value)[0]
 
@@ -145,7 +142,7 @@ class MongoField(AbstractField):
     def is_virtual(self) -> bool:
         return False
 
-    @property
+    @memoized_property
     def metadata(self) -> List[MongoMetadata]:
         return [
             MongoMetadata(value, name, self.name)
@@ -171,14 +168,13 @@ class MongoVirtualField(MongoField):
     (see metaclass for method docs)
     """
 
-    @property
+    @memoized_property
     def name(self) -> str:
         return f"{self.resource_name}.{self._name}"
 
-    @property
+    @memoized_property
     def type(self) -> str:
-        hints = get_type_hints(self._value.fget)
-        return str(hints["return"]) if "return" in hints else "undefined"
+        return class_properties.return_type(self._value)
 
     @property
     def is_virtual(self) -> bool:
@@ -206,7 +202,7 @@ class MongoResource(AbstractResource):
     def app(self) -> str:
         return self._app
 
-    @property
+    @memoized_property
     def primary_key(self) -> str:
         field = next(
             (
@@ -219,7 +215,7 @@ class MongoResource(AbstractResource):
 
         return field if field is None else field.name
 
-    @property
+    @memoized_property
     def normal_fields(self) -> List[MongoField]:
         return [
             MongoField(field, self.name, self.primary_key)
@@ -227,27 +223,12 @@ class MongoResource(AbstractResource):
             if not isinstance(field, (LazyReferenceField, ReferenceField))
         ]
 
-    @property
+    @memoized_property
     def virtual_fields(self) -> List[MongoVirtualField]:
-        fields = []
-
-        for name in dir(self._value):
-            try:
-                value = getattr(self._value, name)
-
-                if isinstance(value, property):
-                    fields.append(MongoVirtualField(value, name, self.name))
-            except AttributeError:
-                logger.info(
-                    f'unable to get virtual "{name}" from {self._value}'
-                )
-
-            except ConnectionFailure:
-                # skip any properties that result in getting data from a mongo
-                # engine connection as these will invariably fail
-                continue
-
-        return fields
+        return [
+            MongoVirtualField(value, name, self.name)
+            for name, value in class_properties.properties(self._value)
+        ]
 
     @property
     def relationships(self) -> list:
@@ -1,16 +1,18 @@
-from app.lib.logger import logger
+from app.lib import memoized_property
 from app.summarize.lib.extractors import (
     AbstractField,
     AbstractMetadata,
     AbstractRelationship,
     AbstractResource,
 )
+from app.summarize.lib.extractors.class_properties import class_properties
+from app.summarize.lib.extractors.value_renderer import value_renderer
 from django.db.models.base import ModelBase
 from django.db.models.fields import Field as ModelField
 from django.db.models.fields.related import RelatedField
 from django.db.models.fields.reverse_related import ForeignObjectRel
 from re import sub
-from typing import List, Optional, Union, get_type_hints
+from typing import List, Optional, Union
 
 
 # HELPER FUNCTIONS
@@ -28,16 +30,13 @@ def get_resource_name(resource: ModelBase) -> str:
 class PGMetadata(AbstractMetadata):
     """Postgres field metadata (singular) concrete class."""
 
-    @property
+    @memoized_property
     def name(self):
         return f"{self._field_name}.{self._name}"
 
-    @property
+    @memoized_property
     def value(self):
-
-        # strip memory address if present
-        value = sub(r" \S+ at 0x[0-9A-Za-z]{9}", "", str(self._value))
-        return value
+        return value_renderer(self._value)
 
     @property
     def field_name(self):
@@ -58,11 +57,11 @@ class PGField(AbstractField):
     (see metaclass for method docs)
     """
 
-    @property
+    @memoized_property
     def name(self) -> str:
         return f"{self.resource_name}.{self._value.column}"
 
-    @property
+    @memoized_property
     def type(self) -> str:
         return self._value.get_internal_type()
 
@@ -78,7 +77,7 @@ class PGField(AbstractField):
     def is_virtual(self) -> bool:
         return False
 
-    @property
+    @memoized_property
     def metadata(self) -> List[PGMetadata]:
         return [
             PGMetadata(value, name, self.name)
@@ -103,14 +102,13 @@ class PGVirtualField(PGField):
     (see metaclass for method docs)
     """
 
-    @property
+    @memoized_property
     def name(self) -> str:
         return f"{self.resource_name}.{self._name}"
 
-    @property
+    @memoized_property
     def type(self) -> str:
-        hints = get_type_hints(self._value.fget)
-        return str(hints["return"]) if "return" in hints else "undefined"
+        return class_properties.return_type(self._value)
 
     @property
     def is_virtual(self) -> bool:
@@ -134,15 +132,15 @@ class PGRelationship(AbstractRelationship):
     (see metaclass for method docs)
     """
 
-    @property
+    @memoized_property
     def type(self) -> str:
         return sub("Rel$", "", type(self._value).__name__)
 
-    @property
+    @memoized_property
     def field_name(self) -> str:
         return PGField(self._value.target_field, self.resource_name).name
 
-    @property
+    @memoized_property
     def related_field_name(self) -> str:
         return PGField(self._value.field, self.related_resource_name).name
 
@@ -150,7 +148,7 @@ class PGRelationship(AbstractRelationship):
     def resource_name(self) -> str:
         return self._resource_name
 
-    @property
+    @memoized_property
     def related_resource_name(self) -> str:
         return get_resource_name(self._value.related_model)
 
@@ -172,40 +170,38 @@ class PGResource(AbstractResource):
     def app(self) -> str:
         return self._app
 
-    @property
+    @memoized_property
     def primary_key(self) -> str:
         return PGField(self._value._meta.pk, self.name).name
 
-    @property
+    @memoized_property
+    def _model_fields(self) -> list:
+        """
+        Get all django fields of resource, shared by fields and relations.
+        """
+
+        return self._value._meta.get_fields()
+
+    @memoized_property
     def normal_fields(self) -> List[PGField]:
         return [
             PGField(field, self.name, self.primary_key)
-            for field in self._value._meta.get_fields()
+            for field in self._model_fields
             if isinstance(field, (ModelField, RelatedField))
         ]
 
-    @property
+    @memoized_property
     def virtual_fields(self) -> List[PGVirtualField]:
-        fields = []
-
-        for name in dir(self._value):
-            try:
-                value = getattr(self._value, name)
-
-                if isinstance(value, property):
-                    fields.append(PGVirtualField(value, name, self.name))
-            except AttributeError:
-                logger.info(
-                    f'unable to get virtual "{name}" from {self._value}'
-                )
-
-        return fields
+        return [
+            PGVirtualField(value, name, self.name)
+            for name, value in class_properties.properties(self._value)
+        ]
 
-    @property
+    @memoized_property
     def relationships(self) -> List[PGRelationship]:
         return [
             PGRelationship(field, self.name)
-            for field in self._value._meta.get_fields()
+            for field in self._model_fields
             if isinstance(field, ForeignObjectRel)
         ]
 
@@ -0,0 +1,258 @@
+from app.summarize.lib.extractors.abstract_resource import (
+    AbstractField,
+    AbstractMetadata,
+    AbstractRelationship,
+    AbstractResource,
+)
+from hashlib import sha256
+from typing import Any, Dict, Optional, Tuple
+
+# one copy of each distinct description or metadata value seen during
+# extraction, reset once per refresh
+shared_texts: Dict[str, str] = {}
+
+
+# HELPER FUNCTIONS
+
+
+def share_text(text: Optional[str]) -> Optional[str]:
+    """
+    Get the shared copy of a text, so records repeating a description or
+    metadata value reference (and pickle) a single string.
+    """
+
+    if text is None:
+        return None
+
+    return shared_texts.setdefault(text, text)
+
+
+# BASE RECORD CLASS
+
+
+class Record:
+    """
+    Frozen, `__slots__` backed record of extracted data.
+
+    Subclasses declare their attributes in `__slots__` (which also sets the
+    positional order of constructor arguments) and the subset of those that
+    are persisted as database columns in `columns`. Records hold no
+    reference to the `django` or `mongoengine` objects they were extracted
+    from, and are picklable so they can cross process boundaries.
+
+    Each record has a `content_hash` covering its columns and the hashes of
+    its child records, so an unchanged hash means an unchanged subtree.
+    """
+
+    # the only slot not set by the constructor, filled on first access of
+    # `content_hash`
+    __slots__ = ("_content_hash",)
+    columns: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any) -> None:
+        if len(values) != len(self.__slots__):
+            raise TypeError(
+                f"{type(self).__name__} takes {len(self.__slots__)} "
+                + f"values ({len(values)} given)"
+            )
+
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is frozen")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is frozen")
+
+    def __reduce__(self) -> Tuple:
+        return (type(self), self.values)
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self.values == other.values
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.values))
+
+    @property
+    def values(self) -> Tuple:
+        """Get all record values in `__slots__` order."""
+
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @property
+    def children(self) -> Tuple["Record", ...]:
+        """Get child records covered by this record's content hash."""
+
+        return ()
+
+    @property
+    def content_hash(self) -> str:
+        """Get hash of record columns and child record hashes."""
+
+        try:
+            return self._content_hash
+        except AttributeError:
+            content = sha256(
+                repr(tuple(getattr(self, c) for c in self.columns)).encode()
+            )
+            for child in self.children:
+                content.update(child.content_hash.encode())
+
+            object.__setattr__(self, "_content_hash", content.hexdigest())
+
+            return self._content_hash
+
+    def row(self) -> Dict[str, Any]:
+        """Get values of database columns, including the content hash."""
+
+        row = {column: getattr(self, column) for column in self.columns}
+        row["content_hash"] = self.content_hash
+
+        return row
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__}: name="{self.name}">'
+
+
+# RECORD CLASSES
+
+
+class MetadataRecord(Record):
+    """Record of extracted metadata (singular)."""
+
+    __slots__ = ("name", "field_name", "value", "description")
+    columns = __slots__
+
+    @classmethod
+    def from_extractor(cls, metadata: AbstractMetadata) -> "MetadataRecord":
+        """Copy extracted values from a metadata extractor."""
+
+        return cls(
+            metadata.name,
+            metadata.field_name,
+            share_text(metadata.value),
+            share_text(metadata.description),
+        )
+
+
+class FieldRecord(Record):
+    """Record of an extracted field and its metadata."""
+
+    __slots__ = (
+        "name",
+        "type",
+        "resource_name",
+        "is_primary_key",
+        "is_virtual",
+        "description",
+        "metadata",
+    )
+    columns = __slots__[:-1]
+
+    @property
+    def children(self) -> Tuple[MetadataRecord, ...]:
+        return self.metadata
+
+    @classmethod
+    def from_extractor(cls, field: AbstractField) -> "FieldRecord":
+        """Copy extracted values from a field extractor."""
+
+        return cls(
+            field.name,
+            field.type,
+            field.resource_name,
+            field.is_primary_key,
+            field.is_virtual,
+            share_text(field.description),
+            tuple(
+                MetadataRecord.from_extractor(meta) for meta in field.metadata
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__}: name="{self.name}" type="{self.type}">'
+        )
+
+
+class RelationshipRecord(Record):
+    """Record of an extracted relationship."""
+
+    __slots__ = (
+        "name",
+        "type",
+        "field_name",
+        "related_field_name",
+        "resource_name",
+        "related_resource_name",
+        "description",
+    )
+    columns = __slots__
+
+    @classmethod
+    def from_extractor(
+        cls, relationship: AbstractRelationship
+    ) -> "RelationshipRecord":
+        """Copy extracted values from a relationship extractor."""
+
+        return cls(
+            relationship.name,
+            relationship.type,
+            relationship.field_name,
+            relationship.related_field_name,
+            relationship.resource_name,
+            relationship.related_resource_name,
+            share_text(relationship.description),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__}: type="{self.type}" '
+            + f'to="{self.related_resource_name}">'
+        )
+
+
+class ResourceRecord(Record):
+    """Record of an extracted resource and its fields and relationships."""
+
+    __slots__ = (
+        "type",
+        "name",
+        "app",
+        "database_type",
+        "source_link",
+        "description",
+        "fields",
+        "relationships",
+    )
+    columns = __slots__[:-2]
+
+    @property
+    def children(self) -> Tuple[Record, ...]:
+        return self.fields + self.relationships
+
+    @classmethod
+    def from_extractor(cls, resource: AbstractResource) -> "ResourceRecord":
+        """Copy extracted values from a resource extractor."""
+
+        return cls(
+            resource.type,
+            resource.name,
+            resource.app,
+            resource.database_type,
+            resource.source_link,
+            share_text(resource.description),
+            tuple(
+                FieldRecord.from_extractor(field) for field in resource.fields
+            ),
+            tuple(
+                RelationshipRecord.from_extractor(relationship)
+                for relationship in resource.relationships
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__}: type="{self.type}" name="{self.name}">'
+        )
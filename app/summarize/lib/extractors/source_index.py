@@ -0,0 +1,216 @@
+import ast
+import sys
+import tokenize
+from inspect import (
+    getcomments,
+    getsourcefile,
+    getsourcelines,
+    indentsize,
+    isclass,
+    isfunction,
+    ismethod,
+    ismodule,
+)
+from typing import Dict, List, Optional, Tuple
+
+
+# HELPER FUNCTIONS
+
+
+def read_comments(lines: List[str], lnum: int) -> Optional[str]:
+    """
+    Get the comment block leading the source line at index `lnum`, or the
+    comments at the top of the file if `lnum` is 0. Mirrors
+    `inspect.getcomments`.
+    """
+
+    if lnum == 0:
+        # skip a shebang line and any blank lines at the top of the file
+        start = 1 if lines and lines[0][:2] == "#!" else 0
+        while start < len(lines) and lines[start].strip() in ("", "#"):
+            start += 1
+
+        comments = []
+        end = start
+        while end < len(lines) and lines[end][:1] == "#":
+            comments.append(lines[end].expandtabs())
+            end += 1
+
+        return "".join(comments) or None
+
+    indent = indentsize(lines[lnum])
+    end = lnum - 1
+    comments = []
+
+    # collect contiguous comment lines above `lnum` at the same indentation
+    while (
+        end >= 0
+        and lines[end].lstrip()[:1] == "#"
+        and indentsize(lines[end]) == indent
+    ):
+        comments.insert(0, lines[end].expandtabs().lstrip())
+        end -= 1
+
+    # strip empty comment lines from both ends of the block
+    while comments and comments[0].strip() == "#":
+        comments.pop(0)
+    while comments and comments[-1].strip() == "#":
+        comments.pop()
+
+    return "".join(comments) or None
+
+
+def index_class_lines(source: str) -> Dict[str, int]:
+    """
+    Map the qualified name of every class in a module source to the index
+    of its first line, including decorators.
+    """
+
+    class_lines = {}
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                qualname = f"{prefix}{child.name}"
+                first_line = min(
+                    [child.lineno]
+                    + [decorator.lineno for decorator in child.decorator_list]
+                )
+                class_lines.setdefault(qualname, first_line - 1)
+                visit(child, f"{qualname}.")
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                visit(child, f"{prefix}{child.name}.<locals>.")
+            else:
+                visit(child, prefix)
+
+    visit(ast.parse(source), "")
+
+    return class_lines
+
+
+# SOURCE FILE CLASS
+
+
+class SourceFile:
+    """Lines of a source file, with class start lines indexed on demand."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        with tokenize.open(path) as file:
+            self.lines = file.readlines()
+
+        self.__class_lines = None
+        self.__comments = {}
+
+    def class_line(self, qualname: str) -> Optional[int]:
+        """Get index of the first line of a class by qualified name."""
+
+        if self.__class_lines is None:
+            self.__class_lines = index_class_lines("".join(self.lines))
+
+        return self.__class_lines.get(qualname)
+
+    def comments(self, lnum: int) -> Optional[str]:
+        """Get the comment block leading the line at index `lnum`."""
+
+        if lnum not in self.__comments:
+            self.__comments[lnum] = read_comments(self.lines, lnum)
+
+        return self.__comments[lnum]
+
+
+# SOURCE INDEX CLASS
+
+
+class SourceIndex:
+    """
+    Index of source files of extracted objects, mapping each class to its
+    file, start line and leading comment block.
+
+    Each file is read and parsed at most once per refresh, so after the
+    first lookup in a module `source_link` and `description` lookups don't
+    re-scan source the way `inspect` does. Call `clear` at the start of a
+    refresh so edited files are picked up.
+    """
+
+    def __init__(self) -> None:
+        self.__files = {}
+
+    def clear(self) -> None:
+        """Drop all indexed files."""
+
+        self.__files = {}
+
+    def __file(self, path: Optional[str]) -> Optional[SourceFile]:
+        """Get indexed source file for a path, reading it if needed."""
+
+        if not path:
+            return None
+
+        if path not in self.__files:
+            try:
+                self.__files[path] = SourceFile(path)
+            except (OSError, SyntaxError, UnicodeDecodeError):
+                self.__files[path] = None
+
+        return self.__files[path]
+
+    def locate(self, obj: object) -> Optional[Tuple[SourceFile, int]]:
+        """
+        Get the source file of a class, function, method or module, and the
+        index of the line it starts on.
+        """
+
+        if ismethod(obj):
+            obj = obj.__func__
+
+        if isfunction(obj):
+            code = obj.__code__
+            source_file = self.__file(code.co_filename)
+            return source_file and (source_file, code.co_firstlineno - 1)
+
+        if ismodule(obj):
+            source_file = self.__file(getattr(obj, "__file__", None))
+            return source_file and (source_file, 0)
+
+        if isclass(obj):
+            module = sys.modules.get(obj.__module__)
+            source_file = self.__file(getattr(module, "__file__", None))
+            lnum = source_file and source_file.class_line(obj.__qualname__)
+            return None if lnum is None else (source_file, lnum)
+
+        return None
+
+    def source_location(self, cls: type) -> Tuple[str, int]:
+        """
+        Get path of the source file of a class and its 1-based start line.
+        Raises `OSError` if the source can not be found.
+        """
+
+        location = self.locate(cls)
+
+        # fall back to `inspect` for classes not found by parsing their
+        # module, e.g. ones created dynamically
+        if location is None:
+            return getsourcefile(cls), getsourcelines(cls)[1]
+
+        source_file, lnum = location
+
+        return source_file.path, lnum + 1
+
+    def get_comments(self, obj: object) -> Optional[str]:
+        """Get the comment block leading an object's source, if any."""
+
+        location = self.locate(obj)
+
+        if location is None:
+            return getcomments(obj) if isclass(obj) else None
+
+        source_file, lnum = location
+
+        return source_file.comments(lnum)
+
+
+# index shared by all extractors, reset once per refresh
+source_index = SourceIndex()
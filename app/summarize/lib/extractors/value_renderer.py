@@ -0,0 +1,166 @@
+import re
+from app.summarize.lib import DefaultTransformer
+from inspect import isbuiltin, isclass, isfunction, ismethod
+from typing import Any, Callable, Dict, Tuple
+
+# memory addresses in default object reprs, e.g. `<Foo object at 0x7f..>`
+address_pattern = re.compile(r" at 0x[0-9a-fA-F]+")
+
+# values that are cheap to render and never worth caching
+primitive_types = (str, int, float, bool, type(None))
+
+
+# HELPER FUNCTIONS
+
+
+def get_value_type(value: Any) -> str:
+    """Get the rendering rule name for a metadata value."""
+
+    if isinstance(value, primitive_types):
+        return "primitive"
+    if isclass(value):
+        return "class"
+    if isfunction(value) or isbuiltin(value):
+        return "function"
+    if ismethod(value):
+        return "method"
+    if isinstance(value, (list, tuple)):
+        return "sequence"
+    if isinstance(value, (set, frozenset)):
+        return "set"
+    if isinstance(value, dict):
+        return "mapping"
+    if callable(getattr(value, "deconstruct", None)):
+        return "deconstructible"
+
+    return "object"
+
+
+def get_qualified_name(value: Any) -> str:
+    """Get full name of a function or method including module path."""
+
+    qualname = getattr(value, "__qualname__", None) or value.__name__
+    module = getattr(value, "__module__", None)
+
+    return f"{module}.{qualname}" if module else qualname
+
+
+# VALUE RENDERER CLASS
+
+
+class ValueRenderer:
+    """
+    Render field metadata values as canonical strings that are stable
+    across processes, so unchanged metadata never registers as updated.
+
+    Primitives render as `str` does. Functions and methods render by
+    qualified name, containers render their items recursively (sets in
+    sorted order), objects that can be deconstructed (e.g. `django`
+    validators) render by their import path and arguments, and anything
+    else renders as `str` with memory addresses stripped.
+
+    Shared values such as validators, defaults and choices are rendered once
+    per refresh, keyed by identity. Call `clear` at the start of a refresh.
+    """
+
+    def __init__(self) -> None:
+        # map of `id(value)` to `(value, rendered)`. The value is kept so
+        # its id can't be reused by another object during the refresh
+        self.__rendered: Dict[int, Tuple[Any, str]] = {}
+
+        self.__transformer = DefaultTransformer(
+            lambda value: get_value_type(value),
+            lambda value, _: address_pattern.sub("", str(value)),
+        )
+
+        rules: Dict[str, Callable[[Any, str], str]] = {
+            "primitive": lambda value, _: str(value),
+            "class": lambda value, _: str(value),
+            "function": (
+                lambda value, _: f"<function {get_qualified_name(value)}>"
+            ),
+            "method": (
+                lambda value, _: f"<method {get_qualified_name(value)}>"
+            ),
+            "sequence": self.__sequence,
+            "set": self.__set,
+            "mapping": self.__mapping,
+            "deconstructible": self.__deconstructible,
+        }
+
+        for pair in rules.items():
+            self.__transformer.register(*pair)
+
+    def clear(self) -> None:
+        """Drop all rendered values."""
+
+        self.__rendered = {}
+
+    def __item(self, value: Any) -> str:
+        """Render a value nested in a container, quoting primitives."""
+
+        if isinstance(value, primitive_types):
+            return repr(value)
+
+        return self(value)
+
+    def __sequence(self, value: Any, _: str) -> str:
+        """Render a list or tuple."""
+
+        items = [self.__item(item) for item in value]
+
+        if isinstance(value, list):
+            return f"[{', '.join(items)}]"
+        if len(items) == 1:
+            return f"({items[0]},)"
+
+        return f"({', '.join(items)})"
+
+    def __set(self, value: Any, _: str) -> str:
+        """Render a set in sorted order, since set order is not stable."""
+
+        if not value:
+            return f"{type(value).__name__}()"
+
+        return f"{{{', '.join(sorted(self.__item(i) for i in value))}}}"
+
+    def __mapping(self, value: Any, _: str) -> str:
+        """Render a dict in insertion order."""
+
+        items = [
+            f"{self.__item(key)}: {self.__item(item)}"
+            for key, item in value.items()
+        ]
+
+        return f"{{{', '.join(items)}}}"
+
+    def __deconstructible(self, value: Any, _: str) -> str:
+        """Render an object by its import path and constructor arguments."""
+
+        try:
+            path, args, kwargs = value.deconstruct()[-3:]
+        except (TypeError, ValueError):
+            return address_pattern.sub("", str(value))
+
+        arguments = [self.__item(arg) for arg in args] + [
+            f"{key}={self.__item(kwargs[key])}" for key in sorted(kwargs)
+        ]
+
+        return f"{path}({', '.join(arguments)})"
+
+    def __call__(self, value: Any) -> str:
+        """Render a metadata value."""
+
+        if isinstance(value, primitive_types):
+            return str(value)
+
+        key = id(value)
+
+        if key not in self.__rendered:
+            self.__rendered[key] = (value, self.__transformer(value))
+
+        return self.__rendered[key][1]
+
+
+# renderer shared by all extractors, reset once per refresh
+value_renderer = ValueRenderer()
@@ -1,6 +1,10 @@
 import os
 import sys
 from .extractors import MongoResource, PGResource
+from .extractors.class_properties import class_properties
+from .extractors.records import shared_texts
+from .extractors.source_index import source_index
+from .extractors.value_renderer import value_renderer
 from app.lib.types import MongoDocumentClasses, MongoModelType
 from django.apps import apps
 from django.db.models.base import ModelBase
@@ -73,3 +77,9 @@ class MarshallModels:
         # use a fresh `django` instance per instantiation
         django = __import__("django")
         django.setup()
+
+        # source files and classes may have changed since the last refresh
+        class_properties.clear()
+        shared_texts.clear()
+        source_index.clear()
+        value_renderer.clear()
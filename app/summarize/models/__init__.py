@@ -1,13 +1,21 @@
+from .change_record import ChangeRecord
 from .commit_snapshot import CommitSnapshot
 from .field import Field
 from .metadata import Metadata
+from .refresh_checkpoint import RefreshCheckpoint
 from .relationship import Relationship
 from .resource import Resource
+from .snapshot_checkpoint import SnapshotCheckpoint
+from .text import Text
 
 __all__ = [
+    "ChangeRecord",
     "CommitSnapshot",
     "Field",
     "Metadata",
+    "RefreshCheckpoint",
     "Relationship",
     "Resource",
+    "SnapshotCheckpoint",
+    "Text",
 ]
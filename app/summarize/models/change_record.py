@@ -0,0 +1,27 @@
+from app.lib import BaseModel, db
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class ChangeRecord(BaseModel):
+    __tablename__ = "change_record"
+
+    # columns
+    records = db.Column(JSONB, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    # references
+    snapshot_id = db.Column(
+        db.Integer,
+        db.ForeignKey("commit_snapshot.id"),
+        index=True,
+        nullable=False,
+    )
+
+    # serializer config
+    serialize_rules = ("-date_modified", "-id")
+
+    def __repr__(self):
+        return (
+            f'<ChangeRecord: snapshot="{self.snapshot_id}" '
+            + f'count="{self.count}">'
+        )
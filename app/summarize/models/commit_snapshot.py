@@ -1,5 +1,7 @@
 from app.lib import BaseModel, db
 from sqlalchemy.dialects.postgresql import JSONB
+import json
+import zlib
 
 
 class CommitSnapshot(BaseModel):
@@ -7,10 +9,53 @@ class CommitSnapshot(BaseModel):
 
     # columns
     commit_id = db.Column(db.String(), unique=True, nullable=False)
-    diff = db.Column(JSONB, nullable=False)
+    diff = db.deferred(db.Column(JSONB), group="payload")
+    payload = db.deferred(db.Column(db.LargeBinary), group="payload")
+    changes = db.deferred(db.Column(JSONB), group="changes")
+    layout = db.Column(db.Integer, default=2, nullable=False)
+    op_count = db.Column(db.Integer)
+    byte_size = db.Column(db.Integer)
+    is_stale = db.Column(db.Boolean, default=False, nullable=False)
+
+    # relationships
+    change_records = db.relationship(
+        "ChangeRecord", order_by="ChangeRecord.id"
+    )
 
     # serializer config
-    serialize_rules = ("-date_modified", "-id")
+    serialize_rules = ("-date_modified", "-id", "-payload", "-change_records")
+
+    @property
+    def decoded_diff(self):
+        # snapshots without operations need not load their payload
+        if self.op_count == 0:
+            return []
+
+        if self.payload is not None:
+            return json.loads(zlib.decompress(self.payload))
+
+        return self.diff
+
+    @property
+    def logged_changes(self):
+        # records flushed to the snapshot row itself, followed by records
+        # appended as change record rows
+        if self.changes is None and not self.change_records:
+            return None
+
+        return (self.changes or []) + [
+            record
+            for batch in self.change_records
+            for record in batch.records
+        ]
+
+    def store_diff(self, diff, compressed=False):
+        encoded = json.dumps(diff, separators=(",", ":")).encode()
+
+        self.op_count = len(diff)
+        self.byte_size = len(encoded)
+        self.diff = None if compressed else diff
+        self.payload = zlib.compress(encoded) if compressed else None
 
     def __repr__(self):
         return f'<CommitSnapshot: commit="{self.id}">'
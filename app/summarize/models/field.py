@@ -9,12 +9,13 @@ class Field(NamedBaseModel):
     is_virtual = db.Column(db.Boolean(), default=False)
     is_primary_key = db.Column(db.Boolean(), default=False)
     is_archived = db.Column(db.Boolean, default=False, nullable=False)
-    description = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
 
     # references
     resource_name = db.Column(
         db.String(), db.ForeignKey("resource.name"), nullable=False
     )
+    description_hash = db.Column(db.String(64), db.ForeignKey("text.hash"))
 
     # relationships
     comments = db.relationship(
@@ -23,6 +24,9 @@ class Field(NamedBaseModel):
         backref="field",
         cascade="all, delete-orphan",
     )
+    description_text = db.relationship(
+        "Text", foreign_keys="Field.description_hash", lazy="joined"
+    )
     meta_data = db.relationship(
         "Metadata",
         foreign_keys="Metadata.field_name",
@@ -30,5 +34,9 @@ class Field(NamedBaseModel):
         cascade="all, delete-orphan",
     )
 
+    @property
+    def description(self):
+        return self.description_text and self.description_text.content
+
     def __repr__(self):
         return f'<Field: name="{self.name}" type="{self.type}">'
@@ -5,13 +5,32 @@ class Metadata(NamedBaseModel):
     __tablename__ = "metadata"
 
     # columns
-    value = db.Column(db.String(), nullable=False)
-    description = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
 
     # references
     field_name = db.Column(
         db.String(), db.ForeignKey("field.name"), nullable=False
     )
+    value_hash = db.Column(
+        db.String(64), db.ForeignKey("text.hash"), nullable=False
+    )
+    description_hash = db.Column(db.String(64), db.ForeignKey("text.hash"))
+
+    # relationships
+    value_text = db.relationship(
+        "Text", foreign_keys="Metadata.value_hash", lazy="joined"
+    )
+    description_text = db.relationship(
+        "Text", foreign_keys="Metadata.description_hash", lazy="joined"
+    )
+
+    @property
+    def value(self):
+        return self.value_text and self.value_text.content
+
+    @property
+    def description(self):
+        return self.description_text and self.description_text.content
 
     def __repr__(self):
         return f'<Metadata: name="{self.name}">'
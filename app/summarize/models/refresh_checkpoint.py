@@ -0,0 +1,22 @@
+from app.lib import BaseModel, db
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class RefreshCheckpoint(BaseModel):
+    __tablename__ = "refresh_checkpoint"
+
+    # columns
+    commit_id = db.Column(db.String(), unique=True, nullable=False)
+    chunk_size = db.Column(db.Integer, default=0, nullable=False)
+    chunk = db.Column(db.Integer, default=0, nullable=False)
+    stages = db.Column(JSONB, default=list, nullable=False)
+    is_complete = db.Column(db.Boolean, default=False, nullable=False)
+
+    # serializer config
+    serialize_rules = ("-id",)
+
+    def __repr__(self):
+        return (
+            f'<RefreshCheckpoint: commit="{self.commit_id}" '
+            + f'chunk="{self.chunk}">'
+        )
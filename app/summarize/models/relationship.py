@@ -6,7 +6,7 @@ class Relationship(NamedBaseModel):
 
     # columns
     type = db.Column(db.String(), nullable=False)
-    description = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
 
     # references
     field_name = db.Column(db.String(), nullable=False,)
@@ -15,6 +15,16 @@ class Relationship(NamedBaseModel):
         db.String(), db.ForeignKey("resource.name"), nullable=False
     )
     related_resource_name = db.Column(db.String(), nullable=False,)
+    description_hash = db.Column(db.String(64), db.ForeignKey("text.hash"))
+
+    # relationships
+    description_text = db.relationship(
+        "Text", foreign_keys="Relationship.description_hash", lazy="joined"
+    )
+
+    @property
+    def description(self):
+        return self.description_text and self.description_text.content
 
     def __repr__(self):
         return (
@@ -9,8 +9,11 @@ class Resource(NamedBaseModel):
     app = db.Column(db.String(), nullable=False)
     database_type = db.Column(DatabaseTypesSQLAlchemy, nullable=False)
     source_link = db.Column(db.String())
-    description = db.Column(db.Text)
     is_archived = db.Column(db.Boolean, default=False, nullable=False)
+    content_hash = db.Column(db.String(64))
+
+    # references
+    description_hash = db.Column(db.String(64), db.ForeignKey("text.hash"))
 
     # relationships
     comments = db.relationship(
@@ -19,6 +22,9 @@ class Resource(NamedBaseModel):
         backref="resource",
         cascade="all, delete-orphan",
     )
+    description_text = db.relationship(
+        "Text", foreign_keys="Resource.description_hash", lazy="joined"
+    )
     fields = db.relationship(
         "Field",
         foreign_keys="Field.resource_name",
@@ -32,6 +38,10 @@ class Resource(NamedBaseModel):
         cascade="all, delete-orphan",
     )
 
+    @property
+    def description(self):
+        return self.description_text and self.description_text.content
+
     def __repr__(self):
         return (
             f'<Resource: type="{self.type}" name="{self.name}" '
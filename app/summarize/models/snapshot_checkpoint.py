@@ -0,0 +1,42 @@
+from app.lib import BaseModel, db
+from sqlalchemy.dialects.postgresql import JSONB
+import json
+import zlib
+
+
+class SnapshotCheckpoint(BaseModel):
+    __tablename__ = "snapshot_checkpoint"
+
+    # columns
+    state = db.deferred(db.Column(JSONB), group="payload")
+    payload = db.deferred(db.Column(db.LargeBinary), group="payload")
+    layout = db.Column(db.Integer, default=2, nullable=False)
+    byte_size = db.Column(db.Integer)
+
+    # references
+    snapshot_id = db.Column(
+        db.Integer,
+        db.ForeignKey("commit_snapshot.id"),
+        unique=True,
+        nullable=False,
+    )
+
+    # serializer config
+    serialize_rules = ("-date_modified", "-id", "-payload")
+
+    @property
+    def decoded_state(self):
+        if self.payload is not None:
+            return json.loads(zlib.decompress(self.payload))
+
+        return self.state
+
+    def store_state(self, state, compressed=False):
+        encoded = json.dumps(state, separators=(",", ":")).encode()
+
+        self.byte_size = len(encoded)
+        self.state = None if compressed else state
+        self.payload = zlib.compress(encoded) if compressed else None
+
+    def __repr__(self):
+        return f'<SnapshotCheckpoint: snapshot="{self.snapshot_id}">'
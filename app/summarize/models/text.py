@@ -0,0 +1,18 @@
+from app.database import db
+from sqlalchemy_serializer import SerializerMixin
+
+
+class Text(db.Model, SerializerMixin):
+    """
+    Content-addressed text, shared by every row referencing the same
+    description or metadata value.
+    """
+
+    __tablename__ = "text"
+
+    # columns
+    hash = db.Column(db.String(64), primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<Text: hash="{self.hash}">'
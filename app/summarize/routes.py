@@ -2,6 +2,12 @@ from app.lib import validate_body
 from app.summarize.models.commit_snapshot import CommitSnapshot
 from flask import abort, Blueprint, jsonify, request
 from app.summarize.lib.diff_databases import diff_databases
+from app.summarize.lib.diff_databases.lib import (
+    get_cached_commit_state,
+    get_commit_diff,
+    refresh_report,
+    to_list,
+)
 from app.summarize.lib import SummarizerModels
 from threading import Thread
 
@@ -25,7 +31,13 @@ def index_resources():
         commit_snapshot = CommitSnapshot.query.filter_by(
             commit_id=commit_id
         ).first()
-        return jsonify(commit_snapshot.to_dict())
+        return jsonify(
+            {
+                **commit_snapshot.to_dict(),
+                "diff": commit_snapshot.decoded_diff,
+                "changes": commit_snapshot.logged_changes,
+            }
+        )
     except AttributeError as e:
         abort(
             404,
@@ -35,6 +47,75 @@ def index_resources():
         )
 
 
+@summarize_blueprint.route("/commits/<commit_id>", methods=["GET"])
+def show_commit_resources(commit_id: str):
+
+    # get optional app and resource scopes from query params
+    app_name = request.args.get("app")
+    resource_name = request.args.get("resource")
+
+    # reconstruct all resources as of the commit, or reuse a cached state
+    state = get_cached_commit_state(commit_id)
+
+    if state is None:
+        abort(
+            404,
+            description=(
+                f'no database snapshot found with commit id "{commit_id}"'
+            ),
+        )
+
+    # scope the cached state before listing it, as listing copies it
+    resources = state
+
+    if app_name:
+        resources = {
+            name: r for name, r in resources.items() if r["app"] == app_name
+        }
+
+        # return failure code if no resources existed for app
+        if not resources:
+            abort(404, description=f'app "{app_name}" not found')
+
+    if resource_name:
+        name = next(
+            (n for n in sorted(resources) if n.endswith(f".{resource_name}")),
+            None,
+        )
+
+        # return failure code if resource did not exist at commit
+        if not name:
+            abort(404, description=f'resource "{resource_name}" not found')
+
+        return jsonify(to_list({name: resources[name]})[0])
+
+    return jsonify(to_list(resources))
+
+
+@summarize_blueprint.route("/diff", methods=["GET"])
+def show_commit_diff():
+
+    # get commit ids to compare from query params
+    from_commit_id = request.args.get("from")
+    to_commit_id = request.args.get("to")
+
+    if not from_commit_id or not to_commit_id:
+        abort(400, description='both "from" and "to" commit ids are required')
+
+    commit_diff = get_commit_diff(from_commit_id, to_commit_id)
+
+    if commit_diff is None:
+        abort(
+            404,
+            description=(
+                "no database snapshot found with commit id "
+                + f'"{from_commit_id}" or "{to_commit_id}"'
+            ),
+        )
+
+    return jsonify(commit_diff)
+
+
 @summarize_blueprint.route("/<app_name>", methods=["GET"])
 def index_app_resources(app_name: str):
     app_resources = SummarizerModels.get_app_resources(app_name)
@@ -77,7 +158,10 @@ refresh_status = RefreshStatus()
 @validate_body(
     {
         "type": "object",
-        "properties": {"force": {"type": "boolean"}},
+        "properties": {
+            "force": {"type": "boolean"},
+            "dry_run": {"type": "boolean"},
+        },
         "additionalProperties": False,
     }
 )
@@ -90,6 +174,7 @@ def refresh_models():
 
     body = request.get_json()
     force = body["force"] if "force" in body else False
+    dry_run = body["dry_run"] if "dry_run" in body else False
 
     # set refresh status to true and fork a new thread for refreshing the
     # repo and updating the DB. When it completes, refresh status will be
@@ -97,11 +182,23 @@ def refresh_models():
     refresh_status.set(True)
     thread = Thread(
         target=diff_databases,
-        args=(lambda: refresh_status.set(False), force),
+        args=(lambda: refresh_status.set(False), force, dry_run),
     )
     thread.start()
 
+    message = "dry run" if dry_run else "database refresh"
+
     return (
-        {"status": "success", "data": "database refresh initiated..."},
+        {"status": "success", "data": f"{message} initiated..."},
         200,
     )
+
+
+@summarize_blueprint.route("/refresh", methods=["GET"])
+def show_refresh():
+    return jsonify(
+        {
+            "running": refresh_status.running,
+            "report": refresh_report.to_dict(),
+        }
+    )
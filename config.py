@@ -2,13 +2,32 @@ from os import getenv
 
 
 class Config:
+    COMMIT_CHUNK_SIZE = int(getenv("COMMIT_CHUNK_SIZE") or 0)
     CSRF_ENABLED = True
     CSRF_SECRET_KEY = getenv("CSRF_SECRET_KEY")
     DEBUG = False
     DEVELOPMENT = True
+    EXTRACTION_CACHE_DIR = getenv("EXTRACTION_CACHE_DIR", "extraction_cache")
+    EXTRACTION_SHARD_BY_MODULE = getenv("EXTRACTION_SHARD_BY_MODULE") == "1"
+    EXTRACTION_WORKERS = int(getenv("EXTRACTION_WORKERS") or 1)
+    REFRESH_CHUNK_SIZE = int(getenv("REFRESH_CHUNK_SIZE") or 0)
+    REFRESH_INCREMENTAL = getenv("REFRESH_INCREMENTAL") == "1"
+    REFRESH_STAGE_WORKERS = int(getenv("REFRESH_STAGE_WORKERS") or 1)
+    REFRESH_STAGING = getenv("REFRESH_STAGING") == "1"
     SECRET_KEY = getenv("SECRET_KEY")
+    SNAPSHOT_CHECKPOINT_BUDGET = int(
+        getenv("SNAPSHOT_CHECKPOINT_BUDGET") or 50000
+    )
+    SNAPSHOT_CHECKPOINT_INTERVAL = int(
+        getenv("SNAPSHOT_CHECKPOINT_INTERVAL") or 50
+    )
+    SNAPSHOT_STORAGE = getenv("SNAPSHOT_STORAGE") or "jsonb"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    STATE_CACHE_BYTES = int(getenv("STATE_CACHE_BYTES") or 256 * 1024 * 1024)
     THREADS_PER_PAGE = 2
+    TRACING = [t for t in (getenv("TRACING") or "").split(",") if t]
+    TRACING_FILE = getenv("TRACING_FILE") or "trace.jsonl"
+    WRITE_BATCH_SIZE = int(getenv("WRITE_BATCH_SIZE") or 1000)
 
 
 user = getenv("POSTGRES_USER")